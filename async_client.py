@@ -0,0 +1,169 @@
+# Import builtin libs
+import asyncio
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+# Import custom libs
+from utils import *
+from metrics import get_metrics
+
+
+def is_throttling_error(error):
+    # Botocore errors carry the service error code in the response, other clients may set "code" attribute
+    response = getattr(error, "response", None) or {}
+    code = response.get("Error", {}).get("Code") or getattr(error, "code", None)
+    return code in THROTTLING_ERROR_CODES
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit adjusted with AIMD rule: every successful call increases the limit additively,
+    every throttling response cuts it by half. Must be used from inside the event loop.
+    """
+    def __init__(self, initial: int = ASYNC_INITIAL_CONCURRENCY, minimum: int = ASYNC_MIN_CONCURRENCY,
+                 maximum: int = ASYNC_MAX_CONCURRENCY):
+        self.limit = float(min(initial, maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.active = 0
+        self.condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.active < int(self.limit))
+            self.active += 1
+
+    async def release(self):
+        async with self.condition:
+            self.active -= 1
+            self.condition.notify_all()
+
+    def on_success(self):
+        # Whole limit is increased by one after a full window of successful calls
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def on_throttle(self):
+        self.limit = max(self.minimum, self.limit / 2)
+
+
+class AsyncTranslationClient:
+    """
+    Single translation client shared by the whole process. Blocking API calls are executed in a bounded
+    thread pool driven by an event loop running in the background thread, so the number of threads never grows
+    with the number of documents. Sync code uses map_sync, async code may await submit/map directly.
+    """
+    def __init__(self, max_concurrency: int = ASYNC_MAX_CONCURRENCY, max_retries: int = ASYNC_MAX_RETRIES):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="translate")
+        self.loop = asyncio.new_event_loop()
+        self.limiter = None
+        self.loop_thread = threading.Thread(target=self.run_loop, name="translate-loop", daemon=True)
+        self.loop_thread.start()
+
+    def run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.limiter = AdaptiveLimiter(maximum=self.max_concurrency)
+        self.loop.run_forever()
+
+    async def submit(self, func, *args, fallback=None):
+        """
+        Calls blocking function within the concurrency limit, throttled calls are retried with jittered backoff
+        :param fallback: function called instead of func in the last attempt, e.g. translating with another engine
+        """
+        for attempt in range(self.max_retries + 1):
+            call = fallback if fallback is not None and attempt == self.max_retries else func
+            await self.limiter.acquire()
+            try:
+                result = await self.loop.run_in_executor(self.executor, call, *args)
+            except Exception as error:
+                if not is_throttling_error(error) or attempt == self.max_retries:
+                    raise
+                self.limiter.on_throttle()
+                get_metrics().increment("translation_api_throttled_total")
+            else:
+                self.limiter.on_success()
+                return result
+            finally:
+                await self.limiter.release()
+            # Full jitter backoff spreads retries of all the waiting calls in time
+            await asyncio.sleep(random.uniform(0, min(ASYNC_BACKOFF_CAP, ASYNC_BACKOFF_BASE * 2 ** attempt)))
+
+    def record_throttle(self):
+        """
+        Records throttling absorbed by the engine itself, e.g. by failing over to another one,
+        so the concurrency limit is cut as if the call was throttled. May be called from any thread.
+        """
+        get_metrics().increment("translation_api_throttled_total")
+        if self.limiter is not None:
+            self.loop.call_soon_threadsafe(self.limiter.on_throttle)
+
+    async def map(self, func, items, fallback=None):
+        return await asyncio.gather(*(self.submit(func, item, fallback=fallback) for item in items))
+
+    def map_sync(self, func, items, fallback=None):
+        """
+        Applies func to every item concurrently and blocks until all results are ready
+        :param fallback: function applied to the items still throttled in the last attempt
+        :return: list of results in the order of items
+        """
+        items = list(items)
+        if not items:
+            return []
+        return asyncio.run_coroutine_threadsafe(self.map(func, items, fallback), self.loop).result()
+
+    def close(self):
+        """
+        Stops the event loop and its thread, then the thread pool once the running calls are finished
+        """
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop_thread.join()
+        self.loop.close()
+        self.executor.shutdown(wait=True)
+
+
+_translation_client = None
+_translation_client_pid = None
+_translation_client_lock = threading.Lock()
+
+
+def get_translation_client():
+    """
+    Returns translation client of the current process, forked workers get their own one as threads don't survive fork
+    """
+    global _translation_client, _translation_client_pid
+    with _translation_client_lock:
+        if _translation_client is None or _translation_client_pid != os.getpid():
+            _translation_client = AsyncTranslationClient()
+            _translation_client_pid = os.getpid()
+        return _translation_client
+
+
+def configure_translation_client(max_concurrency):
+    """
+    Replaces client of the current process, used by pool workers which share the quota of the service
+    """
+    global _translation_client, _translation_client_pid
+    with _translation_client_lock:
+        if _translation_client is not None and _translation_client_pid == os.getpid():
+            if _translation_client.max_concurrency == max_concurrency:
+                return _translation_client
+            # Threads of the previous client are stopped, client inherited from the parent process has none
+            _translation_client.close()
+        _translation_client = AsyncTranslationClient(max_concurrency=max_concurrency)
+        _translation_client_pid = os.getpid()
+        return _translation_client
+
+
+def configure_translating_process(processes: int = 1, engine_name: str = None):
+    """
+    Sizes client of the process sending translation requests to the concurrency limit of the engine,
+    processes translating at the same time share quota of the service, so each one gets its part of it
+    :param processes: number of processes translating at the same time, e.g. job workers
+    :param engine_name: names of engines as accepted by create_engine, None means TRANSLATION_ENGINE
+    """
+    # Engines use the error handling of the client, so they are imported here to avoid circular import
+    from engines import get_translation_engine
+    engine = get_translation_engine(engine_name)
+    return configure_translation_client(max(ASYNC_MIN_CONCURRENCY, engine.max_concurrency // processes))
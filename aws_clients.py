@@ -0,0 +1,47 @@
+# Import builtin libs
+import os
+import threading
+# Import third-party libs
+import boto3.session
+from botocore.config import Config
+# Import custom libs
+from utils import *
+from shared_variables import AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY
+
+# Connection pool of each service is sized to the number of calls the process makes to it concurrently
+POOL_CONNECTIONS = {
+    "translate": ASYNC_MAX_CONCURRENCY,
+    "s3": S3_MAX_POOL_CONNECTIONS,
+}
+
+_clients = {}
+_clients_pid = None
+_clients_lock = threading.Lock()
+
+
+def create_client(service_name, region_name):
+    config = Config(max_pool_connections=POOL_CONNECTIONS.get(service_name, AWS_DEFAULT_POOL_CONNECTIONS),
+                    tcp_keepalive=True,
+                    connect_timeout=AWS_CONNECT_TIMEOUT,
+                    read_timeout=AWS_READ_TIMEOUT)
+    # Session isn't thread-safe, so each client is created from its own one
+    session = boto3.session.Session(aws_access_key_id=AWS_ACCESS_KEY_ID,
+                                    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+                                    region_name=region_name)
+    return session.client(service_name=service_name, use_ssl=True, config=config)
+
+
+def get_aws_client(service_name, region_name: str = AWS_REGION):
+    """
+    Returns client of the service shared by all threads of the current process, it's created on first use.
+    Connections don't survive fork, so a forked worker builds its own clients instead of inheriting them.
+    """
+    global _clients_pid
+    with _clients_lock:
+        if _clients_pid != os.getpid():
+            _clients.clear()
+            _clients_pid = os.getpid()
+        key = (service_name, region_name)
+        if key not in _clients:
+            _clients[key] = create_client(service_name, region_name)
+        return _clients[key]
@@ -0,0 +1,117 @@
+# Import builtin libs
+import re
+# Import custom libs
+from utils import *
+
+
+class SegmentBatcher:
+    """
+    Packs many short segments into a single translation request up to the byte limit of the service.
+    Segments are joined with sentinel lines which survive translation, the result is split back on them.
+    If the number of pieces doesn't match, segments of that batch are translated one by one.
+    """
+    delimiter = "\n" + BATCH_SENTINEL + "\n"
+    split_pattern = re.compile(r"\s*" + re.escape(BATCH_SENTINEL) + r"\s*")
+
+    def __init__(self, byte_limit: int = TRANSLATE_BYTE_LIMIT):
+        self.byte_limit = byte_limit
+        self.delimiter_size = len(self.delimiter.encode("UTF-8"))
+
+    @staticmethod
+    def split_edge_whitespace(segment):
+        """
+        Splits segment into leading whitespace, core text and trailing whitespace
+        Translation services tend to drop the edge whitespace, so it's kept aside and re-attached afterwards
+        """
+        core = segment.strip()
+        if not core:
+            return segment, "", ""
+        start = segment.find(core)
+        return segment[:start], core, segment[start + len(core):]
+
+    def pack(self, segments):
+        """
+        Groups segments into batches, each batch joined with delimiters fits in the byte limit
+        :param segments: list[str] of stripped, non-empty segments
+        :return: list[list[str]]
+        """
+        batches = []
+        current = []
+        current_size = 0
+        for segment in segments:
+            size = len(segment.encode("UTF-8"))
+            # Segment that contains the sentinel itself or exceeds the limit must be sent alone
+            if BATCH_SENTINEL in segment or size + self.delimiter_size > self.byte_limit:
+                batches.append([segment])
+                continue
+            if current and current_size + self.delimiter_size + size > self.byte_limit:
+                batches.append(current)
+                current = []
+                current_size = 0
+            current_size += size + (self.delimiter_size if current else 0)
+            current.append(segment)
+        if current:
+            batches.append(current)
+        return batches
+
+    def join(self, batch):
+        return self.delimiter.join(batch)
+
+    def split(self, translated, batch):
+        """
+        Splits translated batch back into segments
+        :return: list[str] with one translation per segment of the batch or None if it can't be done reliably
+        """
+        if len(batch) == 1:
+            return [translated.strip()]
+        pieces = self.split_pattern.split(translated.strip())
+        if len(pieces) != len(batch) or not all(pieces):
+            return None
+        return pieces
+
+    def translate_batch(self, batch, request):
+        """
+        Translates single batch with given request function, falls back to per-segment calls
+        :param request: callable taking text and returning its translation
+        :return: dict mapping segments of the batch to translations
+        """
+        pieces = self.split(request(self.join(batch)), batch)
+        if pieces is None:
+            pieces = [request(segment).strip() for segment in batch]
+        return dict(zip(batch, pieces))
+
+    @staticmethod
+    def is_translatable(core):
+        # Numbers, dates, codes and punctuation are left as they are, text needs at least one letter
+        return any(character.isalpha() for character in core)
+
+    def prepare(self, segments):
+        """
+        Deduplicates segments and removes their edge whitespace, segments without letters are skipped
+        :return: tuple of stripped segments to be translated and dictionary mapping each source segment to its parts
+        """
+        parts = {}
+        cores = {}
+        for segment in segments:
+            if segment is None or segment in parts:
+                continue
+            leading, core, trailing = self.split_edge_whitespace(segment)
+            if not self.is_translatable(core):
+                core = ""
+            parts[segment] = leading, core, trailing
+            if core:
+                cores[core] = None
+        return list(cores), parts
+
+    @staticmethod
+    def assemble(parts, translated_cores):
+        """
+        Builds translations of source segments from translated cores and their original edge whitespace
+        """
+        translation = {}
+        for segment, (leading, core, trailing) in parts.items():
+            if not core:
+                translation[segment] = segment
+            else:
+                translation[segment] = leading + translated_cores[core] + trailing
+        return translation
@@ -0,0 +1,321 @@
+# Import builtin libs
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+import traceback
+import zipfile
+from xml.sax.saxutils import escape
+# Import custom libs
+from utils import *
+from metrics import get_metrics, summarize
+
+logger = logging.getLogger(__name__)
+
+# Words of synthetic texts, sentences are drawn from them with fixed seed, so corpora are reproducible
+WORDS = ("prezentacja", "dokument", "arkusz", "wynik", "sprzedaż", "klient", "projekt", "raport", "kwartał",
+         "budżet", "zespół", "analiza", "plan", "cel", "rynek", "produkt", "umowa", "termin", "koszt", "zysk")
+
+CONTENT_TYPES_HEAD = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                      '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                      '<Default Extension="rels" '
+                      'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                      '<Default Extension="xml" ContentType="application/xml"/>')
+RELS_HEAD = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+             '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">')
+RELATIONSHIP = '<Relationship Id="{}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/{}" ' \
+               'Target="{}"/>'
+
+
+class SentenceSource:
+    """
+    Draws sentences of the corpus, the given fraction of them repeats one of the sentences drawn before
+    """
+    def __init__(self, duplicate_ratio, seed):
+        self.duplicate_ratio = duplicate_ratio
+        self.random = random.Random(seed)
+        self.drawn = []
+
+    def sentence(self):
+        if self.drawn and self.random.random() < self.duplicate_ratio:
+            return self.random.choice(self.drawn)
+        sentence = " ".join(self.random.choice(WORDS) for _ in range(self.random.randint(3, 12))).capitalize()
+        self.drawn.append(sentence)
+        return sentence
+
+
+def write_presentation(file_path, sentences, slides, paragraphs, runs):
+    # Presentation is built with python-pptx, so it has all the parts PowerPoint expects
+    from pptx import Presentation
+    from pptx.util import Inches
+    prs = Presentation()
+    for _ in range(slides):
+        slide = prs.slides.add_slide(prs.slide_layouts[6])
+        text_frame = slide.shapes.add_textbox(Inches(1), Inches(1), Inches(8), Inches(5)).text_frame
+        for i in range(paragraphs):
+            paragraph = text_frame.paragraphs[0] if i == 0 else text_frame.add_paragraph()
+            for _ in range(runs):
+                paragraph.add_run().text = sentences.sentence() + " "
+    prs.save(file_path)
+
+
+def write_document(file_path, sentences, paragraphs, runs):
+    body = []
+    for _ in range(paragraphs):
+        body.append("<w:p>{}</w:p>".format("".join(
+            '<w:r><w:t xml:space="preserve">{} </w:t></w:r>'.format(escape(sentences.sentence()))
+            for _ in range(runs))))
+    with zipfile.ZipFile(file_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", CONTENT_TYPES_HEAD +
+                         '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-'
+                         'officedocument.wordprocessingml.document.main+xml"/></Types>')
+        archive.writestr("_rels/.rels", RELS_HEAD + RELATIONSHIP.format("rId1", "officeDocument",
+                                                                        "word/document.xml") + "</Relationships>")
+        archive.writestr("word/document.xml",
+                         '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                         '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                         '<w:body>{}</w:body></w:document>'.format("".join(body)))
+
+
+def write_workbook(file_path, sentences, rows, columns):
+    # Cells refer to the shared strings table, repeated texts share one entry as they do in Excel
+    strings = {}
+    sheet_rows = []
+    for row in range(1, rows + 1):
+        cells = []
+        for column in range(columns):
+            index = strings.setdefault(sentences.sentence(), len(strings))
+            cells.append('<c r="{}{}" t="s"><v>{}</v></c>'.format(chr(ord("A") + column % 26), row, index))
+        sheet_rows.append('<row r="{}">{}</row>'.format(row, "".join(cells)))
+    with zipfile.ZipFile(file_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", CONTENT_TYPES_HEAD +
+                         '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-'
+                         'officedocument.spreadsheetml.sheet.main+xml"/>'
+                         '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.'
+                         'openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                         '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.'
+                         'openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/></Types>')
+        archive.writestr("_rels/.rels", RELS_HEAD + RELATIONSHIP.format("rId1", "officeDocument",
+                                                                        "xl/workbook.xml") + "</Relationships>")
+        archive.writestr("xl/_rels/workbook.xml.rels", RELS_HEAD +
+                         RELATIONSHIP.format("rId1", "worksheet", "worksheets/sheet1.xml") +
+                         RELATIONSHIP.format("rId2", "sharedStrings", "sharedStrings.xml") + "</Relationships>")
+        archive.writestr("xl/workbook.xml",
+                         '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                         '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                         'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                         '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        archive.writestr("xl/worksheets/sheet1.xml",
+                         '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                         '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                         '<sheetData>{}</sheetData></worksheet>'.format("".join(sheet_rows)))
+        archive.writestr("xl/sharedStrings.xml",
+                         '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                         '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" count="{0}" '
+                         'uniqueCount="{0}">{1}</sst>'.format(len(strings), "".join(
+                             '<si><t xml:space="preserve">{}</t></si>'.format(escape(text)) for text in strings)))
+
+
+def generate_corpus(folder, options):
+    """
+    Writes synthetic files of every kind into the folder
+    :return: dictionary mapping extension to list of file names
+    """
+    os.makedirs(folder, exist_ok=True)
+    sentences = SentenceSource(options.duplicate_ratio, options.seed)
+    corpus = {".pptx": [], ".docx": [], ".xlsx": []}
+    for i in range(options.files):
+        name = "presentation_{}.pptx".format(i)
+        write_presentation(os.path.join(folder, name), sentences, options.slides, options.paragraphs, options.runs)
+        corpus[".pptx"].append(name)
+        name = "document_{}.docx".format(i)
+        write_document(os.path.join(folder, name), sentences, options.slides * options.paragraphs, options.runs)
+        corpus[".docx"].append(name)
+        name = "workbook_{}.xlsx".format(i)
+        write_workbook(os.path.join(folder, name), sentences, options.cells // options.columns, options.columns)
+        corpus[".xlsx"].append(name)
+    return corpus
+
+
+def percentile(values, fraction):
+    # Nearest-rank percentile, enough for comparing runs with each other
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))]
+
+
+def run_translators(files, workspace, options):
+    """
+    Translates every file separately with the classes of translators.py
+    :return: list of latencies of files in seconds
+    """
+    from context import TranslationContext
+    from translators import translate_file
+    target_folder = os.path.join(workspace, "target")
+    os.makedirs(target_folder, exist_ok=True)
+    context = TranslationContext(input_l="pl", output_l="en", source_folder=workspace, target_folder=target_folder,
+                                 engine_name="mock",
+                                 translation_memory_path=os.path.join(workspace, "translation_memory.sqlite3"))
+    latencies = []
+    for file in files:
+        start = time.perf_counter()
+        translate_file(file, context)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run_batch(files, workspace, options):
+    """
+    Translates all files at once with the process pool and the segment index, the way jobs of the server do
+    :return: list with latency of the whole batch in seconds
+    """
+    from context import TranslationContext
+    from translators import translate_files, create_file_executor
+    from async_client import configure_translating_process
+    target_folder = os.path.join(workspace, "target")
+    os.makedirs(target_folder, exist_ok=True)
+    context = TranslationContext(input_l="pl", output_l="en", source_folder=workspace, target_folder=target_folder,
+                                 engine_name="mock",
+                                 translation_memory_path=os.path.join(workspace, "translation_memory.sqlite3"))
+    configure_translating_process(engine_name="mock")
+    start = time.perf_counter()
+    with create_file_executor(options.processes) as executor:
+        for _ in translate_files(files, executor, context):
+            pass
+    return [time.perf_counter() - start]
+
+
+def run_open_it(files, workspace, options):
+    """
+    Translates every file separately with the classes of open_it.py
+    :return: list of latencies of files in seconds
+    """
+    from open_it import TranslatePresentation, TranslateDocument, TranslateWorkbook
+    classes = {".pptx": TranslatePresentation, ".docx": TranslateDocument, ".xlsx": TranslateWorkbook}
+    latencies = []
+    for file in files:
+        start = time.perf_counter()
+        # Legacy classes resolve paths against the script folder, absolute paths are left as they are
+        classes[os.path.splitext(file)[1]](os.path.join(workspace, file), input_l="pl", output_l="en").main()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+SCENARIOS = {
+    "presentation": (run_translators, [".pptx"]),
+    "document": (run_translators, [".docx"]),
+    "workbook": (run_translators, [".xlsx"]),
+    "batch": (run_batch, [".pptx", ".docx", ".xlsx"]),
+    "open_it_presentation": (run_open_it, [".pptx"]),
+    "open_it_document": (run_open_it, [".docx"]),
+    "open_it_workbook": (run_open_it, [".xlsx"]),
+}
+
+
+def run_scenario(name, corpus_folder, corpus, options, results):
+    """
+    Runs single scenario, it's executed in its own process, so peak memory is measured for the scenario only
+    """
+    # Engine is chosen before anything is created, processes of the pool inherit the environment
+    os.environ["TRANSLATION_ENGINE"] = "mock"
+    os.environ["MOCK_ENGINE_LATENCY"] = str(options.latency)
+    os.environ["MOCK_ENGINE_THROTTLE_RATE"] = str(options.throttle_rate)
+    random.seed(options.seed)
+    runner, extensions = SCENARIOS[name]
+    workspace = tempfile.mkdtemp(prefix="benchmark_{}_".format(name))
+    try:
+        files = [file for extension in extensions for file in corpus[extension]]
+        for file in files:
+            shutil.copyfile(os.path.join(corpus_folder, file), os.path.join(workspace, file))
+        start = time.perf_counter()
+        latencies = runner(files, workspace, options)
+        seconds = time.perf_counter() - start
+    except Exception:
+        # Failed scenario is reported instead of results, so the parent doesn't wait for them forever
+        results.put({"scenario": name, "error": traceback.format_exc()})
+        return
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    summary = summarize(get_metrics().snapshot())
+    counters = summary["counters"]
+    # Linux reports maximum resident set size in kilobytes, children are the processes of the pool
+    peak_rss_kb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                      resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    results.put({
+        "scenario": name,
+        "files": len(files),
+        "seconds": round(seconds, 6),
+        "files_per_second": round(len(files) / seconds, 3) if seconds else None,
+        "latency_p50": percentile(latencies, 0.5),
+        "latency_p99": percentile(latencies, 0.99),
+        "peak_rss_kb": peak_rss_kb,
+        "api_calls": sum(value for key, value in counters.items() if key.startswith("translation_api_calls_total")),
+        "api_throttled": counters.get("translation_api_throttled_total", 0),
+        "characters_sent": counters.get("translation_characters_sent_total", 0),
+        "cache_hit_ratio": summary["cache_hit_ratio"],
+        "stages": summary["stages"],
+    })
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmarks translators against synthetic files and mock engine")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated names of scenarios")
+    parser.add_argument("--files", type=int, default=3, help="number of files of each kind")
+    parser.add_argument("--slides", type=int, default=20, help="slides of each presentation")
+    parser.add_argument("--paragraphs", type=int, default=5, help="paragraphs of each slide")
+    parser.add_argument("--runs", type=int, default=3, help="runs of each paragraph")
+    parser.add_argument("--cells", type=int, default=2000, help="cells of each workbook")
+    parser.add_argument("--columns", type=int, default=10, help="columns of each workbook")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.3, help="fraction of repeated sentences")
+    parser.add_argument("--latency", type=float, default=MOCK_ENGINE_LATENCY, help="latency of API call (s)")
+    parser.add_argument("--throttle-rate", type=float, default=MOCK_ENGINE_THROTTLE_RATE,
+                        help="fraction of throttled API calls")
+    parser.add_argument("--processes", type=int, default=None, help="processes of the batch scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file with results")
+    return parser.parse_args()
+
+
+def main():
+    options = parse_arguments()
+    corpus_folder = tempfile.mkdtemp(prefix="benchmark_corpus_")
+    try:
+        corpus = generate_corpus(corpus_folder, options)
+        results = multiprocessing.Queue()
+        scenarios = []
+        for name in options.scenarios.split(","):
+            logger.info("Running scenario %s", name)
+            process = multiprocessing.Process(target=run_scenario, args=(name, corpus_folder, corpus, options,
+                                                                         results))
+            process.start()
+            scenarios.append(results.get())
+            process.join()
+    finally:
+        shutil.rmtree(corpus_folder, ignore_errors=True)
+
+    report = {"commit": current_commit(), "created": time.time(), "options": vars(options), "scenarios": scenarios}
+    with open(options.output, "w") as target:
+        json.dump(report, target, indent=2)
+    logger.info("Results written to %s", options.output)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", LOG_LEVEL))
+    main()
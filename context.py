@@ -0,0 +1,44 @@
+# Import builtin libs
+from dataclasses import dataclass, replace
+# Import custom libs
+from utils import *
+from engines import get_translation_engine
+from translation_memory import get_translation_memory
+from manifests import get_manifest_store
+
+
+@dataclass(frozen=True)
+class TranslationContext:
+    """
+    Immutable settings of a single translation job, passed to every translator working on it.
+    Only names and paths are kept, so the context can be sent to pool processes,
+    each process resolves the engine and translation memory from its own registries.
+    :param engine_name: names of engines as accepted by create_engine, None means TRANSLATION_ENGINE
+    :param incremental: translate only segments changed since the previous versions of the documents
+    :param document_namespace: owner of the documents, e.g. user, versions are matched by name within it
+    """
+    input_l: str = "pl"
+    output_l: str = "en"
+    source_folder: str = SOURCE_FOLDER
+    target_folder: str = TARGET_FOLDER
+    engine_name: str = None
+    translation_memory_path: str = TRANSLATION_MEMORY_DB
+    incremental: bool = False
+    document_namespace: str = ""
+    manifest_path: str = MANIFEST_DB
+
+    @property
+    def engine(self):
+        return get_translation_engine(self.engine_name)
+
+    @property
+    def translation_memory(self):
+        return get_translation_memory(self.translation_memory_path)
+
+    @property
+    def manifest_store(self):
+        return get_manifest_store(self.manifest_path)
+
+    def evolve(self, **changes):
+        # Contexts are never modified, a job needing other settings gets a copy
+        return replace(self, **changes)
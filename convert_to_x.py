@@ -1,12 +1,15 @@
 from glob import glob
+import logging
 import re
 import os
 import win32com.client as win32
 from win32com.client import constants
 
+logger = logging.getLogger(__name__)
+
 
 def save_as_docx(path, word):
-    print(path)
+    logger.info("Converting %s", path)
     # If file is corrupted or locked it will be skipped
     try:
         doc = word.Documents.Open(path)
@@ -22,11 +25,11 @@ def save_as_docx(path, word):
 
         os.remove(path)
     except:
-        print("Incorrect file")
+        logger.warning("Incorrect file: %s", path)
 
 
 def save_as_xlsx(path, excel):
-    print(path)
+    logger.info("Converting %s", path)
     # If file is corrupted or locked it will be skipped
     try:
         wb = excel.Workbooks.Open(path)
@@ -39,12 +42,12 @@ def save_as_xlsx(path, excel):
 
         os.remove(path)
     except:
-        print("Incorrect file")
+        logger.warning("Incorrect file: %s", path)
 
 
 def save_as_pptx(path, powerpoint):
     # If file is corrupted or locked it will be skipped
-    print(path)
+    logger.info("Converting %s", path)
     try:
         pres = powerpoint.Presentations.Open(path)
 
@@ -57,12 +60,12 @@ def save_as_pptx(path, powerpoint):
 
         os.remove(path)
     except:
-        print("Incorrect file")
+        logger.warning("Incorrect file: %s", path)
 
 
 def convert_rtf_doc(path):
     # Very simple conversion of .rtf file to .doc so it can be used by save_as_docx function
-    print(path)
+    logger.info("Converting %s", path)
     if len(re.findall(".rtf$", path)) == 1:
         os.rename(path, re.sub(r'\.rtf$', '.doc', path))
         path = re.sub(r'\.rtf$', '.doc', path)
@@ -107,4 +110,5 @@ def change_all_to_x():
     excel.Application.Quit()
 
 
+logging.basicConfig(level=logging.INFO)
 change_all_to_x()
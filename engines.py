@@ -0,0 +1,266 @@
+# Import builtin libs
+import json
+import os
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+# Import custom libs
+from utils import *
+from async_client import is_throttling_error, get_translation_client
+
+
+class EngineError(Exception):
+    """
+    Error reported by translation engine, "code" is compared with THROTTLING_ERROR_CODES by the client
+    """
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+class TranslationEngine(ABC):
+    """
+    Translation service used by translators. Engines declare how much text fits in a single request,
+    how many requests may run at once and how much translation costs, so they can be compared and swapped.
+    """
+    name = None
+    # Version is changed whenever translations of the engine may change, e.g. new model or glossary
+    version = "1"
+    byte_limit = TRANSLATE_BYTE_LIMIT
+    max_concurrency = ASYNC_MAX_CONCURRENCY
+    # Price in USD for million characters of source text
+    cost_per_million_chars = 0.0
+    # Translations of deterministic and cheap engines aren't worth keeping in translation memory
+    cacheable = True
+
+    @abstractmethod
+    def translate_text(self, text, input_l, output_l):
+        """
+        Translates text of at most byte_limit bytes
+        :return: translated text
+        """
+        pass
+
+    @property
+    def primary(self):
+        """
+        Engine expected to translate the text, translations made by any other one are degraded
+        """
+        return self
+
+    def translate_text_with_engine(self, text, input_l, output_l, fail_over_throttled=False):
+        """
+        Translates text like translate_text, engines delegating to other ones tell which of them translated it
+        :param fail_over_throttled: whether engines delegating to other ones ask the next one when throttled,
+                                    otherwise throttling is raised, so the client backs off and retries
+        :return: tuple (translated text, engine which translated it)
+        """
+        return self.translate_text(text, input_l, output_l), self
+
+    def estimate_cost(self, characters):
+        return characters / 1000000 * self.cost_per_million_chars
+
+
+class AwsTranslateEngine(TranslationEngine):
+    name = "aws"
+    byte_limit = TRANSLATE_BYTE_LIMIT
+    max_concurrency = ASYNC_MAX_CONCURRENCY
+    cost_per_million_chars = 15.0
+
+    def translate_text(self, text, input_l, output_l):
+        # Client is imported here, so the offline engines work without AWS libraries and credentials
+        from aws_clients import get_aws_client
+        from botocore.exceptions import EndpointConnectionError, ConnectTimeoutError, ReadTimeoutError
+        try:
+            result = get_aws_client("translate").translate_text(Text=text, SourceLanguageCode=input_l,
+                                                                TargetLanguageCode=output_l)
+        except (EndpointConnectionError, ConnectTimeoutError, ReadTimeoutError) as error:
+            raise EngineError(str(error), code=ENGINE_UNAVAILABLE_CODE) from error
+        return result['TranslatedText']
+
+
+class HttpTranslationEngine(TranslationEngine):
+    """
+    Engine calling translation API over HTTP (Yandex compatible), sessions keep connections alive between calls
+    """
+    name = "http"
+    byte_limit = HTTP_ENGINE_BYTE_LIMIT
+    max_concurrency = HTTP_ENGINE_CONCURRENCY
+    cost_per_million_chars = 15.0
+
+    def __init__(self, url: str = HTTP_ENGINE_URL, api_key: str = None, timeout: float = HTTP_ENGINE_TIMEOUT):
+        if api_key is None:
+            from shared_variables import API_KEY
+            api_key = API_KEY
+        self.url = url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def session(self):
+        # Requests is imported here, so the offline engines work without HTTP libraries
+        import requests
+        # Sessions aren't guaranteed to be thread-safe, each thread of the client keeps its own one
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = requests.Session()
+            self.local.session = session
+        return session
+
+    def translate_text(self, text, input_l, output_l):
+        import requests
+        # Text is sent in the body, so long batches don't hit the limit of URL length
+        try:
+            response = self.session().post(self.url, timeout=self.timeout,
+                                           data=dict(key=self.api_key, text=text.encode("UTF-8"),
+                                                     lang="{}-{}".format(input_l, output_l)))
+        except (requests.ConnectionError, requests.Timeout) as error:
+            raise EngineError(str(error), code=ENGINE_UNAVAILABLE_CODE) from error
+        if response.status_code == 429:
+            raise EngineError("Too many requests", code="TooManyRequestsException")
+        if response.status_code >= 500:
+            raise EngineError("Service unavailable", code="ServiceUnavailableException")
+        content = json.loads(response.content)
+        if response.status_code != 200:
+            raise EngineError(content.get("message", "Translation failed"), code=content.get("code"))
+        return content['text'][0]
+
+
+class GlossaryEngine(TranslationEngine):
+    """
+    Offline engine replacing terms from the glossary file, other text is left as it is.
+    It needs neither network nor credentials, so the whole pipeline can run in CI at full speed.
+    Glossary file maps language pairs to terms, e.g. {"pl-en": {"Dzień dobry": "Good morning"}}
+    """
+    name = "glossary"
+    byte_limit = TRANSLATE_BYTE_LIMIT
+    max_concurrency = GLOSSARY_ENGINE_CONCURRENCY
+    cacheable = False
+
+    def __init__(self, glossary: dict = None, glossary_file: str = GLOSSARY_FILE):
+        if glossary is None:
+            glossary = {}
+            if os.path.exists(glossary_file):
+                with open(glossary_file, encoding="UTF-8") as source:
+                    glossary = json.load(source)
+        self.glossary = glossary
+        self.patterns = {}
+
+    def pattern(self, language_pair):
+        if language_pair not in self.patterns:
+            # Longer terms go first, so whole sentences win over the single words they contain
+            terms = sorted(self.glossary.get(language_pair, {}), key=len, reverse=True)
+            self.patterns[language_pair] = re.compile(
+                r"(?<!\w)(?:{})(?!\w)".format("|".join(map(re.escape, terms)))) if terms else None
+        return self.patterns[language_pair]
+
+    def translate_text(self, text, input_l, output_l):
+        language_pair = "{}-{}".format(input_l, output_l)
+        pattern = self.pattern(language_pair)
+        if pattern is None:
+            return text
+        terms = self.glossary[language_pair]
+        return pattern.sub(lambda match: terms[match.group(0)], text)
+
+
+class MockEngine(TranslationEngine):
+    """
+    Local stand-in of a translation service used by benchmarks. Each call waits for the given latency
+    and the given fraction of calls is throttled. Text is upper-cased, so translated files differ from the sources.
+    Settings may be given with MOCK_ENGINE_LATENCY and MOCK_ENGINE_THROTTLE_RATE environment variables,
+    so processes of the pool use the same ones.
+    """
+    name = "mock"
+    byte_limit = TRANSLATE_BYTE_LIMIT
+    max_concurrency = ASYNC_MAX_CONCURRENCY
+
+    def __init__(self, latency: float = None, throttle_rate: float = None):
+        if latency is None:
+            latency = float(os.environ.get("MOCK_ENGINE_LATENCY", MOCK_ENGINE_LATENCY))
+        if throttle_rate is None:
+            throttle_rate = float(os.environ.get("MOCK_ENGINE_THROTTLE_RATE", MOCK_ENGINE_THROTTLE_RATE))
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+
+    def translate_text(self, text, input_l, output_l):
+        time.sleep(self.latency)
+        if random.random() < self.throttle_rate:
+            raise EngineError("Rate exceeded", code="ThrottlingException")
+        return text.upper()
+
+
+class FailoverEngine(TranslationEngine):
+    """
+    Engine trying the given engines in order, the next one is used when the previous one can't be reached
+    or keeps throttling after the client backed off. Batches must fit in every engine and requests are sized
+    for the most limited one. Translations made by any engine but the first one are degraded and never cached.
+    """
+    name = "failover"
+
+    def __init__(self, engines):
+        self.engines = engines
+        self.name = ",".join(engine.name for engine in engines)
+        self.version = ",".join(engine.version for engine in engines)
+        self.byte_limit = min(engine.byte_limit for engine in engines)
+        self.max_concurrency = min(engine.max_concurrency for engine in engines)
+        self.cost_per_million_chars = engines[0].cost_per_million_chars
+        # Translation memory is used whenever the primary engine allows it
+        self.cacheable = engines[0].cacheable
+
+    @property
+    def primary(self):
+        return self.engines[0]
+
+    def translate_text(self, text, input_l, output_l):
+        # Direct calls aren't retried by the client, so throttled engine is replaced at once
+        return self.translate_text_with_engine(text, input_l, output_l, fail_over_throttled=True)[0]
+
+    def translate_text_with_engine(self, text, input_l, output_l, fail_over_throttled=False):
+        for engine in self.engines[:-1]:
+            try:
+                return engine.translate_text_with_engine(text, input_l, output_l, fail_over_throttled)
+            except Exception as error:
+                if is_throttling_error(error):
+                    if not fail_over_throttled:
+                        raise
+                    # Throttling isn't retried any more, the limit is cut before the next engine is asked
+                    get_translation_client().record_throttle()
+                elif getattr(error, "code", None) != ENGINE_UNAVAILABLE_CODE:
+                    raise
+        return self.engines[-1].translate_text_with_engine(text, input_l, output_l, fail_over_throttled)
+
+
+ENGINES = {
+    "aws": AwsTranslateEngine,
+    "http": HttpTranslationEngine,
+    "glossary": GlossaryEngine,
+    "mock": MockEngine,
+}
+
+
+def create_engine(names):
+    """
+    Creates engine from comma separated names, more names make failover engine, e.g. "aws,glossary"
+    """
+    engines = [ENGINES[name.strip()]() for name in names.split(",")]
+    return engines[0] if len(engines) == 1 else FailoverEngine(engines)
+
+
+_translation_engines = {}
+_translation_engines_lock = threading.Lock()
+
+
+def get_translation_engine(names: str = None):
+    """
+    Returns engine of the current process, engines are created on first use and shared by all translators
+    :param names: names of engines as accepted by create_engine, None means TRANSLATION_ENGINE
+                  which may be overridden with the environment variable of the same name
+    """
+    if names is None:
+        names = os.environ.get("TRANSLATION_ENGINE", TRANSLATION_ENGINE)
+    with _translation_engines_lock:
+        if names not in _translation_engines:
+            _translation_engines[names] = create_engine(names)
+        return _translation_engines[names]
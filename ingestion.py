@@ -0,0 +1,114 @@
+# Import builtin libs
+import os
+import shutil
+import zipfile
+from hashlib import sha256
+from tempfile import SpooledTemporaryFile
+# Import third-party libs
+from flask import Request
+# Import custom libs
+from utils import *
+from ooxml_package import CONTENT_TYPES_PART
+
+# Every OOXML package is a zip archive starting with the local file header
+ZIP_SIGNATURE = b"PK\x03\x04"
+# Main part of the package, its absence means the file isn't a document of given type
+MAIN_PARTS = {
+    ".pptx": "ppt/presentation.xml",
+    ".docx": "word/document.xml",
+    ".xlsx": "xl/workbook.xml",
+}
+
+
+class UploadError(Exception):
+    """
+    Upload rejected before translation, message is shown to the user.
+    It isn't ValueError on purpose, the form parser would silently drop the form instead of reporting it.
+    """
+    pass
+
+
+class UploadSpool:
+    """
+    Uploaded file received straight from the request body. Small files stay in memory, bigger ones
+    are spooled to disk. Content is hashed as it arrives and the upload is rejected on the first bytes
+    that can't belong to OOXML package, so the rest of the body isn't stored at all.
+    """
+    def __init__(self, filename, max_size: int = UPLOAD_SPOOL_SIZE, folder: str = UPLOAD_SPOOL_FOLDER,
+                 max_file_size: int = UPLOAD_MAX_FILE_SIZE):
+        self.filename = filename or ""
+        self.extension = os.path.splitext(self.filename)[1].lower()
+        # Extension is known before any content, wrong files are rejected without reading them
+        if self.extension not in ALLOWED_EXTENSIONS:
+            raise UploadError("Wrong extension of sent files")
+        self.max_file_size = max_file_size
+        self.file = SpooledTemporaryFile(max_size=max_size, dir=folder)
+        self.digest = sha256()
+        self.size = 0
+        self.head = b""
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_file_size:
+            raise UploadError("File {} is too big".format(self.filename))
+        if len(self.head) < len(ZIP_SIGNATURE):
+            self.head += data[:len(ZIP_SIGNATURE) - len(self.head)]
+            if not ZIP_SIGNATURE.startswith(self.head):
+                raise UploadError("File {} is not a valid {} document".format(self.filename, self.extension))
+        self.digest.update(data)
+        return self.file.write(data)
+
+    def hexdigest(self):
+        return self.digest.hexdigest()
+
+    def validate_package(self):
+        """
+        Checks the central directory of the complete upload, content of the members isn't decompressed
+        """
+        self.file.seek(0)
+        try:
+            with zipfile.ZipFile(self.file) as archive:
+                names = set(archive.namelist())
+        except (zipfile.BadZipFile, EOFError):
+            raise UploadError("File {} is not a valid {} document".format(self.filename, self.extension))
+        if CONTENT_TYPES_PART not in names or MAIN_PARTS[self.extension] not in names:
+            raise UploadError("File {} is not a valid {} document".format(self.filename, self.extension))
+        self.file.seek(0)
+
+    def save(self, path, chunk_size: int = COPY_CHUNK_SIZE):
+        self.file.seek(0)
+        with open(path, "wb") as target:
+            shutil.copyfileobj(self.file, target, chunk_size)
+
+    def __getattr__(self, name):
+        # Reading, seeking and closing are done by the spooled file itself
+        if name == "file":
+            raise AttributeError(name)
+        return getattr(self.file, name)
+
+    def __iter__(self):
+        return iter(self.file)
+
+
+class IngestingRequest(Request):
+    """
+    Request writing uploaded files straight into upload spools, the form parser gives them to the views
+    as streams of the uploaded files, no other copy of the upload is made
+    """
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Browsers send empty file fields when nothing was chosen, they are reported as missing files by the view
+        if not filename:
+            return SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE, dir=UPLOAD_SPOOL_FOLDER)
+        return UploadSpool(filename)
+
+
+def spool_upload(file):
+    """
+    Returns upload spool of the uploaded file, files parsed by other requests are copied into a new one
+    """
+    if isinstance(file.stream, UploadSpool):
+        return file.stream
+    spool = UploadSpool(file.filename)
+    for chunk in iter(lambda: file.stream.read(DOWNLOAD_CHUNK_SIZE), b""):
+        spool.write(chunk)
+    return spool
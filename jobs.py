@@ -0,0 +1,260 @@
+# Import builtin libs
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import time
+import traceback
+import uuid
+from multiprocessing import Process
+# Import custom libs
+from utils import *
+from metrics import get_metrics
+from sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class JobQueue(SQLiteStore):
+    """
+    Queue of translation jobs kept in SQLite database, shared by the web server and worker processes.
+    No external broker is needed, workers claim jobs with an immediate transaction, so each job is taken once.
+    """
+    # Transactions are controlled explicitly, so claiming the job can lock the database for writing
+    isolation_level = None
+    row_factory = sqlite3.Row
+    pragmas = ("PRAGMA journal_mode=WAL",)
+
+    def __init__(self, db_path: str = JOBS_DB):
+        super().__init__(db_path)
+        self.prepare_database()
+
+    def prepare_database(self):
+        self.connection().execute("CREATE TABLE IF NOT EXISTS jobs ("
+                                  "id TEXT PRIMARY KEY, user TEXT, status TEXT, input_l TEXT, output_l TEXT, "
+                                  "workspace TEXT, files_total INTEGER, files_done INTEGER DEFAULT 0, "
+                                  "result_key TEXT, error TEXT, created REAL, started REAL, finished REAL, "
+                                  "metrics TEXT, cache_key TEXT, degraded TEXT)")
+        self.connection().execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+        # History of the user is read from the covering indexes only, newest jobs first, with or without status filter
+        self.connection().execute("CREATE INDEX IF NOT EXISTS jobs_user ON jobs "
+                                  "(user, created, id, status, input_l, output_l, files_done, files_total)")
+        self.connection().execute("CREATE INDEX IF NOT EXISTS jobs_user_status ON jobs "
+                                  "(user, status, created, id, input_l, output_l, files_done, files_total)")
+        # Totals of all finished jobs are kept up to date, so they are read without scanning the jobs
+        self.connection().execute("CREATE TABLE IF NOT EXISTS metrics_totals (name TEXT PRIMARY KEY, value REAL)")
+
+    def enqueue(self, user, input_l, output_l, workspace, files_total, job_id=None, cache_key=None):
+        """
+        Adds job to the queue and returns its id
+        :param cache_key: key of the result cache computed from the uploaded files, so workers don't hash them again
+        """
+        job_id = job_id or uuid.uuid4().hex
+        self.connection().execute("INSERT INTO jobs (id, user, status, input_l, output_l, workspace, files_total, "
+                                  "created, cache_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                  (job_id, user, JOB_QUEUED, input_l, output_l, workspace, files_total, time.time(),
+                                   cache_key))
+        return job_id
+
+    def add_done(self, user, input_l, output_l, files_total, result_key, job_id=None):
+        """
+        Adds job which is already done, e.g. its result was found in the cache, and returns its id
+        """
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        self.connection().execute("INSERT INTO jobs (id, user, status, input_l, output_l, files_total, files_done, "
+                                  "result_key, created, started, finished) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                  (job_id, user, JOB_DONE, input_l, output_l, files_total, files_total, result_key,
+                                   now, now, now))
+        return job_id
+
+    def claim(self):
+        """
+        Takes the oldest queued job and marks it as running
+        :return: dict describing the job or None if the queue is empty
+        """
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE status = ? ORDER BY created LIMIT 1",
+                               (JOB_QUEUED,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE jobs SET status = ?, started = ? WHERE id = ?",
+                             (JOB_RUNNING, time.time(), row["id"]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        job = dict(row)
+        job["status"] = JOB_RUNNING
+        return job
+
+    def update_progress(self, job_id, files_done):
+        self.connection().execute("UPDATE jobs SET files_done = ? WHERE id = ?", (files_done, job_id))
+
+    def finish(self, job_id, status, result_key=None, error=None, metrics=None, degraded=None):
+        """
+        Marks job as finished, its metrics are saved with it and added to the totals in one transaction
+        :param degraded: names of result files translated partly by other engine than the primary one
+        """
+        metrics = metrics or {}
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("UPDATE jobs SET status = ?, result_key = ?, error = ?, finished = ?, metrics = ?, "
+                         "degraded = ? WHERE id = ?", (status, result_key, error, time.time(), json.dumps(metrics),
+                                                       json.dumps(degraded or []), job_id))
+            conn.executemany("INSERT INTO metrics_totals (name, value) VALUES (?, ?) "
+                             "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+                             metrics.items())
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def complete(self, job_id, result_key, metrics=None, degraded=None):
+        self.finish(job_id, JOB_DONE, result_key=result_key, metrics=metrics, degraded=degraded)
+
+    def fail(self, job_id, error, metrics=None):
+        self.finish(job_id, JOB_FAILED, error=error, metrics=metrics)
+
+    def requeue_stale(self, timeout: int = JOB_STALE_TIMEOUT):
+        """
+        Puts back jobs of workers that died while running them
+        """
+        self.connection().execute("UPDATE jobs SET status = ?, started = NULL WHERE status = ? AND started < ?",
+                                  (JOB_QUEUED, JOB_RUNNING, time.time() - timeout))
+
+    def get(self, job_id):
+        row = self.connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else dict(row)
+
+    def history(self, user, limit: int = HISTORY_PAGE_SIZE, before=None, status=None):
+        """
+        Returns page of the user's jobs, newest first. Pages are read with the cursor instead of the offset,
+        so every page takes the same time however long the history is.
+        :param before: cursor of the page, tuple (created, id) of the last job of the previous page
+        :param status: only jobs with given status are returned, None means all of them
+        :return: tuple (list of dicts describing the jobs, cursor of the next page or None for the last page)
+        """
+        query = "SELECT id, user, status, input_l, output_l, files_done, files_total, created FROM jobs WHERE user = ?"
+        parameters = [user]
+        if status is not None:
+            query += " AND status = ?"
+            parameters.append(status)
+        if before is not None:
+            query += " AND (created, id) < (?, ?)"
+            parameters.extend(before)
+        query += " ORDER BY created DESC, id DESC LIMIT ?"
+        # One job more is read to know whether the next page exists
+        parameters.append(limit + 1)
+        jobs = [dict(row) for row in self.connection().execute(query, parameters)]
+        if len(jobs) <= limit:
+            return jobs, None
+        jobs = jobs[:limit]
+        return jobs, (jobs[-1]["created"], jobs[-1]["id"])
+
+    def metrics_totals(self):
+        return {row["name"]: row["value"] for row in self.connection().execute("SELECT * FROM metrics_totals")}
+
+    def count_by_status(self):
+        return {row["status"]: row["jobs"] for row in
+                self.connection().execute("SELECT status, COUNT(*) AS jobs FROM jobs GROUP BY status")}
+
+
+def run_worker(db_path: str = JOBS_DB, poll_interval: float = JOB_POLL_INTERVAL, workers: int = JOB_WORKERS):
+    """
+    Worker process loop, takes jobs from the queue and translates them one by one
+    :param workers: number of workers sending translation requests at the same time
+    """
+    # Pipeline is imported here, so the web server process doesn't load translation libraries to enqueue jobs
+    from pipeline import translate_job
+    from async_client import configure_translating_process
+    # Segments of the jobs are translated in the worker itself, workers share quota of the translation service
+    configure_translating_process(workers)
+    queue = JobQueue(db_path)
+    metrics = get_metrics()
+    while True:
+        job = queue.claim()
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        # Worker runs one job at a time, so everything measured from now on belongs to this job
+        metrics.drain()
+        metrics.observe("translation_queue_wait", time.time() - job["created"])
+        try:
+            result_key, degraded = translate_job(job, on_progress=lambda done: queue.update_progress(job["id"], done))
+        except Exception:
+            logger.exception("Job %s failed", job["id"])
+            metrics.increment("translation_jobs_total", status=JOB_FAILED)
+            queue.fail(job["id"], traceback.format_exc(), metrics.drain())
+        else:
+            if degraded:
+                logger.warning("Job %s done with degraded translation of %s", job["id"], ", ".join(degraded))
+            else:
+                logger.info("Job %s done", job["id"])
+            metrics.increment("translation_jobs_total", status=JOB_DONE)
+            queue.complete(job["id"], result_key, metrics.drain(), degraded)
+
+
+def run_sweeper(db_path: str = JOBS_DB, interval: float = STORAGE_SWEEP_INTERVAL,
+                requeue_interval: float = JOB_REQUEUE_INTERVAL):
+    """
+    Sweeper process loop, puts back jobs of workers that died while running them,
+    removes expired results and their unused contents from the storage
+    """
+    from storage import get_storage
+    queue = JobQueue(db_path)
+    last_sweep = None
+    while True:
+        try:
+            queue.requeue_stale()
+        except Exception:
+            logger.exception("Requeuing stale jobs failed")
+        if last_sweep is None or time.time() - last_sweep >= interval:
+            last_sweep = time.time()
+            try:
+                removed_results, removed_blobs = get_storage().sweep()
+                logger.info("Removed %d expired results and %d unused blobs", removed_results, removed_blobs)
+            except Exception:
+                logger.exception("Sweeping the storage failed")
+        time.sleep(requeue_interval)
+
+
+def stop_workers(processes):
+    for process in processes:
+        process.terminate()
+
+
+def start_workers(workers: int = JOB_WORKERS, db_path: str = JOBS_DB):
+    """
+    Starts pool of worker processes and the storage sweeper, they are stopped together with the parent process
+    """
+    JobQueue(db_path).requeue_stale()
+    processes = []
+    for i in range(workers):
+        # Workers fan files out to their own process pools, daemonic processes can't have children
+        process = Process(target=run_worker, args=(db_path, JOB_POLL_INTERVAL, workers),
+                          name="translation-worker-{}".format(i))
+        process.start()
+        processes.append(process)
+    sweeper = Process(target=run_sweeper, args=(db_path,), name="storage-sweeper", daemon=True)
+    sweeper.start()
+    processes.append(sweeper)
+    atexit.register(stop_workers, processes)
+    return processes
+
+
+if __name__ == "__main__":
+    # Servers run by WSGI hosts, e.g. gunicorn, never start the workers themselves, they are run with this script
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", LOG_LEVEL))
+    for worker in start_workers():
+        worker.join()
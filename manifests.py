@@ -0,0 +1,139 @@
+# Import builtin libs
+import threading
+import time
+from hashlib import sha256
+# Import custom libs
+from utils import *
+from segment_index import SegmentIndex
+from sqlite_store import SQLiteStore, get_store
+
+
+class ManifestStore(SQLiteStore):
+    """
+    Manifests of translated documents: hashes of segments of the last translated version and their translations.
+    Revised version of the document is compared with its manifest, only new or changed segments are translated
+    and the rest is rebuilt from the stored translations.
+    """
+    def __init__(self, db_path: str = MANIFEST_DB, max_segments: int = MANIFEST_MAX_SEGMENTS,
+                 ttl: int = MANIFEST_TTL):
+        super().__init__(db_path)
+        self.max_segments = max_segments
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.saves_since_eviction = 0
+        self.prepare_database()
+
+    def prepare_database(self):
+        conn = self.connection()
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS manifests ("
+                         "document_key TEXT PRIMARY KEY, segments INTEGER, updated REAL, accessed REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS manifest_segments ("
+                         "document_key TEXT, segment_hash TEXT, translation TEXT, "
+                         "PRIMARY KEY (document_key, segment_hash)) WITHOUT ROWID")
+            conn.execute("CREATE INDEX IF NOT EXISTS manifests_accessed ON manifests (accessed)")
+
+    @staticmethod
+    def document_key(context, file_name):
+        # Versions of the document share the name, translations made by other engines or to other languages differ
+        engine = context.engine
+        return sha256("\x00".join((context.document_namespace, file_name, context.input_l, context.output_l,
+                                   engine.name, engine.version)).encode("UTF-8")).hexdigest()
+
+    @staticmethod
+    def segment_hash(segment):
+        return sha256(segment.encode("UTF-8")).hexdigest()
+
+    def load(self, document_key):
+        """
+        :return: dictionary mapping hashes of segments of the last version to their translations
+        """
+        conn = self.connection()
+        stored = dict(conn.execute("SELECT segment_hash, translation FROM manifest_segments "
+                                   "WHERE document_key = ?", (document_key,)))
+        if stored:
+            with conn:
+                conn.execute("UPDATE manifests SET accessed = ? WHERE document_key = ?", (time.time(), document_key))
+        return stored
+
+    def save(self, document_key, translations):
+        """
+        Replaces manifest of the document with hashes of segments of the new version and their translations
+        """
+        now = time.time()
+        conn = self.connection()
+        with conn:
+            conn.execute("DELETE FROM manifest_segments WHERE document_key = ?", (document_key,))
+            conn.executemany("INSERT INTO manifest_segments VALUES (?, ?, ?)",
+                             [(document_key, segment_hash, translation)
+                              for segment_hash, translation in translations.items()])
+            conn.execute("INSERT OR REPLACE INTO manifests (document_key, segments, updated, accessed) "
+                         "VALUES (?, ?, ?, ?)", (document_key, len(translations), now, now))
+        with self.lock:
+            self.saves_since_eviction += 1
+            evict = self.saves_since_eviction >= MANIFEST_EVICTION_INTERVAL
+            if evict:
+                self.saves_since_eviction = 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """
+        Removes manifests unused for longer than TTL and trims the database to the configured count of segments,
+        manifests of the least recently used documents go first
+        """
+        oldest = time.time() - self.ttl
+        conn = self.connection()
+        with conn:
+            expired = conn.execute("SELECT document_key FROM manifests WHERE accessed <= ?", (oldest,)).fetchall()
+            # Running total of segments of the more recently used documents tells which ones don't fit
+            kept_segments = 0
+            trimmed = []
+            for document_key, segments in conn.execute("SELECT document_key, segments FROM manifests "
+                                                       "WHERE accessed > ? ORDER BY accessed DESC",
+                                                       (oldest,)):
+                kept_segments += segments
+                if kept_segments > self.max_segments:
+                    trimmed.append((document_key,))
+            removed = expired + trimmed
+            conn.executemany("DELETE FROM manifest_segments WHERE document_key = ?", removed)
+            conn.executemany("DELETE FROM manifests WHERE document_key = ?", removed)
+
+    def reuse(self, context, file_segments):
+        """
+        Finds translations of segments unchanged since the previous versions of the files
+        :param file_segments: dictionary mapping file names to their segments
+        :return: dictionary mapping normalized segments to their stored translations
+        """
+        reused = {}
+        for file_name, segments in file_segments.items():
+            stored = self.load(self.document_key(context, file_name))
+            if not stored:
+                continue
+            for segment in segments:
+                if segment is None:
+                    continue
+                normalized = SegmentIndex.normalize(segment)
+                translation = stored.get(self.segment_hash(normalized))
+                if translation is not None:
+                    reused[normalized] = translation
+        return reused
+
+    def update(self, context, file_segments, translation):
+        """
+        Saves manifests of the current versions of the files
+        :param translation: dictionary mapping normalized segments to translations, as made by SegmentIndex
+        """
+        for file_name, segments in file_segments.items():
+            manifest = {}
+            for segment in segments:
+                if segment is None:
+                    continue
+                normalized = SegmentIndex.normalize(segment)
+                if normalized in translation:
+                    manifest[self.segment_hash(normalized)] = translation[normalized]
+            self.save(self.document_key(context, file_name), manifest)
+
+
+def get_manifest_store(db_path: str = MANIFEST_DB):
+    return get_store(ManifestStore, db_path)
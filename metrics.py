@@ -0,0 +1,122 @@
+# Import builtin libs
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+def metric_key(name, **labels):
+    # Metrics are kept flat under their Prometheus names, labels are part of the key
+    if not labels:
+        return name
+    return "{}{{{}}}".format(name, ",".join('{}="{}"'.format(label, value) for label, value in sorted(labels.items())))
+
+
+class Metrics:
+    """
+    Counters and timers of a single process. Values are plain sums, so snapshots taken in pool processes
+    and worker processes can be merged into one summary of the job and into totals of the whole service.
+    """
+    def __init__(self):
+        self.values = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def increment(self, name, value=1, **labels):
+        key = metric_key(name, **labels)
+        with self.lock:
+            self.values[key] += value
+
+    def observe(self, name, seconds, **labels):
+        # Timers are exposed as Prometheus summaries without quantiles, i.e. sum and count
+        key_sum = metric_key(name + "_seconds_sum", **labels)
+        key_count = metric_key(name + "_seconds_count", **labels)
+        with self.lock:
+            self.values[key_sum] += seconds
+            self.values[key_count] += 1
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("translation_stage", time.perf_counter() - start, stage=stage)
+
+    def merge(self, snapshot):
+        with self.lock:
+            for key, value in snapshot.items():
+                self.values[key] += value
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.values)
+
+    def drain(self):
+        """
+        Returns values collected so far and starts counting from zero, used by tasks reporting to their parent
+        """
+        with self.lock:
+            snapshot = dict(self.values)
+            self.values.clear()
+        return snapshot
+
+
+def summarize(snapshot):
+    """
+    Turns snapshot into JSON friendly summary with time of each stage and hit ratio of translation memory
+    """
+    stages = {}
+    counters = {}
+    for key, value in snapshot.items():
+        if key.startswith('translation_stage_seconds_sum{stage="'):
+            stage = key.split('"')[1]
+            stages.setdefault(stage, {})["seconds"] = round(value, 6)
+        elif key.startswith('translation_stage_seconds_count{stage="'):
+            stage = key.split('"')[1]
+            stages.setdefault(stage, {})["count"] = int(value)
+        else:
+            counters[key] = value
+    hits = snapshot.get("translation_cache_hits_total", 0)
+    misses = snapshot.get("translation_cache_misses_total", 0)
+    return {"stages": stages,
+            "counters": counters,
+            "cache_hit_ratio": hits / (hits + misses) if hits + misses else None}
+
+
+def render_prometheus(snapshot, gauges: dict = None):
+    """
+    Renders metrics in Prometheus text exposition format
+    :param gauges: current values which aren't summed, e.g. number of queued jobs
+    """
+    lines = []
+    for key, value in sorted(snapshot.items()):
+        lines.append("{} {}".format(key, repr(float(value))))
+    for key, value in sorted((gauges or {}).items()):
+        lines.append("{} {}".format(key, repr(float(value))))
+    return "\n".join(lines) + "\n"
+
+
+_metrics = None
+_metrics_pid = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """
+    Returns metrics of the current process, forked processes start counting from zero
+    """
+    global _metrics, _metrics_pid
+    with _metrics_lock:
+        if _metrics is None or _metrics_pid != os.getpid():
+            _metrics = Metrics()
+            _metrics_pid = os.getpid()
+        return _metrics
+
+
+def run_measured(func, *args):
+    """
+    Runs task in the pool process and returns its result together with metrics it collected
+    """
+    result = func(*args)
+    return result, get_metrics().drain()
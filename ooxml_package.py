@@ -0,0 +1,179 @@
+# Import builtin libs
+import io
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree
+# Import custom libs
+from utils import *
+from ooxml_rewriter import rewrite_member, target_member_info
+
+CONTENT_TYPES_PART = "[Content_Types].xml"
+PACKAGE_RELS_PART = "_rels/.rels"
+CONTENT_TYPES_NS = "{http://schemas.openxmlformats.org/package/2006/content-types}"
+PRESENTATION_NS = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+RELATIONSHIPS_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+# Parts of Word document that may contain text, both by their content type and by relationship leading to them
+WORD_TEXT_CONTENT_TYPES = {
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.template.main+xml",
+    "application/vnd.ms-word.document.macroEnabled.main+xml",
+    "application/vnd.ms-word.template.macroEnabledTemplate.main+xml",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document.glossary+xml",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.header+xml",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.footer+xml",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.footnotes+xml",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.endnotes+xml",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml",
+}
+WORD_TEXT_RELATIONSHIP_TYPES = {"officeDocument", "glossaryDocument", "header", "footer", "footnotes", "endnotes",
+                                "comments"}
+
+# Parts of Excel workbook containing text: shared strings, inline strings of worksheets and comments
+SPREADSHEET_TEXT_CONTENT_TYPES = {
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.comments+xml",
+}
+SPREADSHEET_TEXT_RELATIONSHIP_TYPES = {"officeDocument", "sharedStrings", "worksheet", "comments"}
+
+
+def read_content_types(archive):
+    """
+    Returns dictionary mapping every member of the package to its content type
+    """
+    root = ElementTree.fromstring(archive.read(CONTENT_TYPES_PART))
+    defaults = {}
+    overrides = {}
+    for element in root:
+        if element.tag == CONTENT_TYPES_NS + "Default":
+            defaults[element.get("Extension").lower()] = element.get("ContentType")
+        elif element.tag == CONTENT_TYPES_NS + "Override":
+            overrides[element.get("PartName").lstrip("/")] = element.get("ContentType")
+    content_types = {}
+    for name in archive.namelist():
+        if name in overrides:
+            content_types[name] = overrides[name]
+        else:
+            content_types[name] = defaults.get(posixpath.splitext(name)[1].lstrip(".").lower())
+    return content_types
+
+
+def rels_part_name(part_name):
+    directory, name = posixpath.split(part_name)
+    return posixpath.join(directory, "_rels", name + ".rels")
+
+
+def iter_relationships(archive, part_name=None):
+    """
+    Yields tuples (relationship id, relationship type, target member) for the part or the package itself
+    Relationship type is shortened to its last segment, e.g. "header"
+    """
+    rels_name = PACKAGE_RELS_PART if part_name is None else rels_part_name(part_name)
+    if rels_name not in archive.NameToInfo:
+        return
+    base = "" if part_name is None else posixpath.dirname(part_name)
+    for element in ElementTree.fromstring(archive.read(rels_name)):
+        if element.get("TargetMode") == "External":
+            continue
+        target = element.get("Target")
+        if target.startswith("/"):
+            target = target.lstrip("/")
+        else:
+            target = posixpath.normpath(posixpath.join(base, target))
+        yield element.get("Id"), element.get("Type").rsplit("/", 1)[-1], target
+
+
+def read_relationships(archive, part_name=None):
+    """
+    Returns list of tuples (relationship type, target member) for the part or the package itself
+    """
+    return [(rel_type, target) for rel_id, rel_type, target in iter_relationships(archive, part_name)]
+
+
+def resolve_slide_parts(archive):
+    """
+    Returns slide members of the presentation in the order of the deck, as listed in ppt/presentation.xml.
+    Slides are resolved through relationships, so neither their names nor their numbering are assumed.
+    """
+    main_parts = [target for rel_type, target in read_relationships(archive) if rel_type == "officeDocument"]
+    if not main_parts:
+        return []
+    presentation_part = main_parts[0]
+    targets = {rel_id: target for rel_id, rel_type, target in iter_relationships(archive, presentation_part)
+               if rel_type == "slide"}
+    root = ElementTree.fromstring(archive.read(presentation_part))
+    slide_id_list = root.find(PRESENTATION_NS + "sldIdLst")
+    if slide_id_list is None:
+        return []
+    slides = []
+    for slide_id in slide_id_list:
+        target = targets.get(slide_id.get(RELATIONSHIPS_NS + "id"))
+        if target is not None and target in archive.NameToInfo:
+            slides.append(target)
+    return slides
+
+
+def discover_text_parts(archive, content_types=WORD_TEXT_CONTENT_TYPES, relationship_types=WORD_TEXT_RELATIONSHIP_TYPES):
+    """
+    Finds every text-bearing part of the package, following relationships from the package root
+    and checking content types declared in [Content_Types].xml
+    :return: list of member names in order of relationships, main part goes first
+    """
+    part_content_types = read_content_types(archive)
+    parts = {}
+    visited = set()
+    # Main part is the target of package level "officeDocument" relationship
+    queue = [target for rel_type, target in read_relationships(archive) if rel_type in relationship_types]
+    while queue:
+        part = queue.pop(0)
+        if part in visited or part not in archive.NameToInfo:
+            continue
+        visited.add(part)
+        # Some parts (e.g. workbook) only lead to the ones containing text
+        if part_content_types[part] in content_types:
+            parts[part] = None
+        queue += [target for rel_type, target in read_relationships(archive, part) if rel_type in relationship_types]
+    # Parts not reachable by relationships are still found by their content type
+    for name, content_type in part_content_types.items():
+        if content_type in content_types:
+            parts[name] = None
+    return list(parts)
+
+
+def extract_texts(archive, parts, rewriter):
+    """
+    Collects texts of all given parts concurrently into one deduplicated list
+    """
+    def extract(part):
+        with archive.open(part) as source:
+            return list(dict.fromkeys(rewriter.iter_texts(source)))
+
+    with ThreadPoolExecutor(max_workers=PACKAGE_WORKERS) as executor:
+        texts = {}
+        for part_texts in executor.map(extract, parts):
+            texts.update(dict.fromkeys(part_texts))
+    return list(texts)
+
+
+def rewrite_parts(archive_source, archive_target, parts, rewriter, translation):
+    """
+    Writes translated copies of all given parts into the target archive.
+    The biggest part is streamed straight into the archive, while the rest is rewritten concurrently
+    into memory buffers and written as soon as the archive is free.
+    """
+    if not parts:
+        return
+    parts = sorted(parts, key=lambda part: archive_source.getinfo(part).file_size, reverse=True)
+
+    def rewrite_to_buffer(part):
+        buffer = io.BytesIO()
+        with archive_source.open(part) as source:
+            rewriter.rewrite(source, buffer, translation)
+        return part, buffer.getvalue()
+
+    with ThreadPoolExecutor(max_workers=PACKAGE_WORKERS) as executor:
+        buffered = executor.map(rewrite_to_buffer, parts[1:])
+        rewrite_member(archive_source, archive_target, parts[0], rewriter, translation)
+        for part, data in buffered:
+            archive_target.writestr(target_member_info(archive_source.getinfo(part)), data)
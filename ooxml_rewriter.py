@@ -0,0 +1,200 @@
+# Import builtin libs
+import codecs
+import re
+import zipfile
+from html import unescape
+from xml.sax.saxutils import escape
+# Import custom libs
+from utils import *
+
+
+class TextNodeRewriter:
+    """
+    Streaming, single-pass reader and writer of text elements in OOXML parts.
+    Text elements ("w:t" in Word, "a:t" in PowerPoint, "t" in Excel) never contain child elements,
+    so the part is scanned chunk by chunk and only a possibly unfinished element is kept between chunks.
+    Memory use depends on the chunk size and the size of paragraphs, not on the size of the part.
+    """
+    def __init__(self, tag: str, chunk_size: int = XML_CHUNK_SIZE, coalescer=None):
+        """
+        :param coalescer: RunCoalescer normalizing the part before it's scanned, None means the part is read as it is;
+                          with the coalescer texts of adjacent runs of a paragraph are translated as one segment
+        """
+        self.tag = tag
+        self.chunk_size = chunk_size
+        self.coalescer = coalescer
+        # Opening tag with optional attributes, self-closing elements are not matched
+        open_tag = r"<{}(?:\s[^>]*?)?(?<!/)>".format(re.escape(tag))
+        self.open_pattern = re.compile(open_tag)
+        self.node_pattern = re.compile(r"({})([^<]*)(</{}>)".format(open_tag, re.escape(tag)))
+
+    def decoded_chunks(self, stream):
+        decoder = codecs.getincrementaldecoder("UTF-8")()
+        while True:
+            chunk = stream.read(self.chunk_size)
+            if not chunk:
+                yield decoder.decode(b"", final=True)
+                return
+            yield decoder.decode(chunk)
+
+    def scan(self, stream, count_merges=False):
+        """
+        Splits the part into pieces of markup and text elements
+        :param stream: binary file-like object, e.g. member of the zip archive opened with ZipFile.open
+        :param count_merges: whether runs merged by the coalescer are counted in metrics
+        :return: generator of tuples, (None, markup) for markup or (opening tag, escaped text, closing tag)
+                 for text elements
+        """
+        buffer = ""
+        if self.coalescer is not None:
+            stream = self.coalescer.wrap(stream, count_merges)
+        chunks = self.decoded_chunks(stream)
+        final = False
+        while not final:
+            try:
+                buffer += next(chunks)
+            except StopIteration:
+                final = True
+            pos = 0
+            for match in self.node_pattern.finditer(buffer):
+                if match.start() > pos:
+                    yield None, buffer[pos:match.start()]
+                yield match.group(1), match.group(2), match.group(3)
+                pos = match.end()
+            # Text element or any other tag may be cut by the end of the chunk, it's kept for the next round
+            hold = len(buffer)
+            if not final:
+                open_match = self.open_pattern.search(buffer, pos)
+                hold = open_match.start() if open_match else buffer.rfind("<", pos)
+                if hold == -1:
+                    hold = len(buffer)
+            if hold > pos:
+                yield None, buffer[pos:hold]
+            buffer = buffer[hold:]
+
+    def group_runs(self, pieces):
+        """
+        Groups text elements of adjacent runs of the same paragraph, they differ only in formatting
+        :param pieces: pieces of the part as returned by scan
+        :return: generator of pieces, text elements come in lists [element, boundary markup, element, ...]
+        """
+        group = []
+        boundary = ""
+        for piece in pieces:
+            if piece[0] is None:
+                if not group:
+                    yield piece
+                    continue
+                boundary += piece[1]
+                # Markup which can't be a run boundary ends the group at once, so only short markup is kept
+                if len(boundary) <= RUN_BOUNDARY_MAX_SIZE and self.coalescer.paragraph_close not in boundary:
+                    continue
+            elif group and self.coalescer.run_boundary_pattern.fullmatch(boundary):
+                group += [boundary, piece]
+                boundary = ""
+                continue
+            if group:
+                yield group
+            if boundary:
+                yield None, boundary
+            group = [piece] if piece[0] is not None else []
+            boundary = ""
+        if group:
+            yield group
+        if boundary:
+            yield None, boundary
+
+    def scan_segments(self, stream, count_merges=False):
+        """
+        Splits the part like scan, text elements come in lists of elements translated as one segment
+        """
+        pieces = self.scan(stream, count_merges)
+        if self.coalescer is None:
+            return ([piece] if piece[0] is not None else piece for piece in pieces)
+        return self.group_runs(pieces)
+
+    def iter_texts(self, stream):
+        """
+        Yields content of every segment in document order, texts of runs of a paragraph are joined into one segment
+        """
+        # Texts are extracted once per part, runs are counted here and not again for every written copy
+        for piece in self.scan_segments(stream, count_merges=True):
+            if isinstance(piece, list):
+                yield "".join(unescape(element[1]) for element in piece[::2])
+
+    @staticmethod
+    def distribute(translated, texts):
+        """
+        Splits translation of joined texts into pieces of the same number, in proportion to lengths of the texts.
+        Pieces are cut after whitespace nearest to the proportional position, anywhere if there's none.
+        """
+        total = sum(len(text) for text in texts) or 1
+        cuts = [match.end() for match in re.finditer(r"\s+", translated)]
+        pieces = []
+        start = 0
+        length = 0
+        for text in texts[:-1]:
+            length += len(text)
+            position = round(len(translated) * length / total)
+            cut = min((cut for cut in cuts if cut >= start), key=lambda cut: abs(cut - position),
+                      default=max(start, position))
+            pieces.append(translated[start:cut])
+            start = cut
+        pieces.append(translated[start:])
+        return pieces
+
+    def rewrite(self, source, target, translation):
+        """
+        Copies the part from source to target stream replacing content of text elements in one pass.
+        Replacement is positional, so one text being prefix of another can't corrupt the output.
+        Translation of the segment joined from many runs is distributed over them, each run keeps its formatting.
+        :param translation: dict mapping source texts to translations, texts not present are left intact
+        :return: number of replaced text elements
+        """
+        encoder = codecs.getincrementalencoder("UTF-8")()
+        replaced = 0
+        for piece in self.scan_segments(source):
+            if not isinstance(piece, list):
+                target.write(encoder.encode(piece[1]))
+                continue
+            elements = piece[::2]
+            texts = [unescape(element[1]) for element in elements]
+            translated = translation.get("".join(texts))
+            # Elements without translation are copied byte for byte
+            if translated is None:
+                target.write(encoder.encode("".join(part if isinstance(part, str) else "".join(part)
+                                                    for part in piece)))
+                continue
+            pieces = [translated] if len(elements) == 1 else self.distribute(translated, texts)
+            for i, (open_tag, text, close_tag) in enumerate(elements):
+                if i:
+                    target.write(encoder.encode(piece[2 * i - 1]))
+                # Pieces of distributed translation may start or end with a space, Word drops it unless preserved
+                if len(elements) > 1 and self.coalescer.preserve_space and pieces[i] != pieces[i].strip() \
+                        and "xml:space" not in open_tag:
+                    open_tag = open_tag[:-1] + ' xml:space="preserve">'
+                target.write(encoder.encode(open_tag + escape(pieces[i]) + close_tag))
+            replaced += len(elements)
+        target.write(encoder.encode("", final=True))
+        return replaced
+
+
+def target_member_info(info):
+    """
+    Writing resets sizes and checksum of the member info, so each target member gets its own copy
+    """
+    target_info = zipfile.ZipInfo(info.filename, info.date_time)
+    target_info.compress_type = info.compress_type
+    target_info.external_attr = info.external_attr
+    return target_info
+
+
+def rewrite_member(archive_source, archive_target, name, rewriter, translation):
+    """
+    Streams translated copy of the archive member straight into the target archive, no temporary files are used
+    """
+    info = archive_source.getinfo(name)
+    target_info = target_member_info(info)
+    with archive_source.open(info) as source, \
+            archive_target.open(target_info, "w", force_zip64=info.file_size > XML_ZIP64_THRESHOLD) as target:
+        return rewriter.rewrite(source, target, translation)
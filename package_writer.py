@@ -0,0 +1,87 @@
+# Import builtin libs
+import struct
+import zipfile
+# Import custom libs
+from utils import *
+
+# Layout of the local file header, only lengths of the file name and extra field are needed to skip it
+LOCAL_HEADER_SIZE = 30
+LOCAL_HEADER_STRUCT = struct.Struct("<4s2B4HL2L2H")
+FLAG_ENCRYPTED = 0x01
+FLAG_DATA_DESCRIPTOR = 0x08
+
+
+class PackageWriter:
+    """
+    Builds translated copy of OOXML package without temporary files.
+    Unchanged members are copied as raw compressed bytes, without decompressing and compressing them again,
+    translated parts are written straight from streams or buffers.
+    :param target: path of the output package or writable binary file-like object (e.g. BytesIO)
+    """
+    def __init__(self, target):
+        self.archive = zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.archive.close()
+
+    def copy_unchanged(self, archive_source, exclude=()):
+        """
+        Copies every member of the source archive that isn't excluded, e.g. going to be translated
+        """
+        exclude = set(exclude)
+        for info in archive_source.infolist():
+            if info.filename not in exclude:
+                self.copy_raw(archive_source, info)
+
+    def copy_raw(self, archive_source, info):
+        # Encrypted members can't be copied as they are, they never appear in Office packages anyway
+        if info.flag_bits & FLAG_ENCRYPTED:
+            self.archive.writestr(info, archive_source.read(info))
+            return
+
+        # Sizes and checksum are known from the central directory, so data descriptor isn't needed
+        target_info = zipfile.ZipInfo(info.filename, info.date_time)
+        target_info.compress_type = info.compress_type
+        target_info.flag_bits = info.flag_bits & ~FLAG_DATA_DESCRIPTOR
+        target_info.create_system = info.create_system
+        target_info.external_attr = info.external_attr
+        target_info.comment = info.comment
+        target_info.CRC = info.CRC
+        target_info.compress_size = info.compress_size
+        target_info.file_size = info.file_size
+        zip64 = info.file_size > zipfile.ZIP64_LIMIT or info.compress_size > zipfile.ZIP64_LIMIT
+
+        # ZipFile has no public API for raw copy, the member is appended the same way ZipFile.writestr does it
+        target = self.archive
+        with archive_source._lock, target._lock:
+            if target._writing:
+                raise ValueError("Can't copy member while another one is being written")
+            if target._seekable:
+                target.fp.seek(target.start_dir)
+            target_info.header_offset = target.fp.tell()
+            target._writecheck(target_info)
+            target._didModify = True
+            target.fp.write(target_info.FileHeader(zip64))
+
+            source = archive_source.fp
+            source.seek(info.header_offset)
+            header = LOCAL_HEADER_STRUCT.unpack(source.read(LOCAL_HEADER_SIZE))
+            source.seek(header[10] + header[11], 1)
+            remaining = info.compress_size
+            while remaining:
+                chunk = source.read(min(remaining, COPY_CHUNK_SIZE))
+                if not chunk:
+                    raise zipfile.BadZipFile("Truncated member {}".format(info.filename))
+                target.fp.write(chunk)
+                remaining -= len(chunk)
+
+            target.filelist.append(target_info)
+            target.NameToInfo[target_info.filename] = target_info
+            target.start_dir = target.fp.tell()
+
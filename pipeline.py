@@ -0,0 +1,109 @@
+# Import builtin libs
+import os
+import zipfile
+from shutil import rmtree
+# Import custom libs
+from utils import *
+from storage import get_storage, result_key
+from metrics import get_metrics
+from context import TranslationContext
+from translators import translate_files, create_file_executor
+from result_cache import get_result_cache, reuse_result
+
+_file_executor = None
+
+
+def get_file_executor():
+    """
+    Returns process pool of the worker, it's created on first use and reused by the following jobs
+    """
+    global _file_executor
+    if _file_executor is None:
+        # Every job worker has its own pool, all of them share quota of the translation service
+        _file_executor = create_file_executor()
+    return _file_executor
+
+
+def list_workspace_files(workspace):
+    """
+    Returns names of files waiting for translation in the job folder
+    """
+    return sorted(entry.name for entry in os.scandir(workspace)
+                  if entry.is_file() and os.path.splitext(entry.name)[1] in ALLOWED_EXTENSIONS)
+
+
+def translate_workspace(workspace, input_l, output_l, on_progress=None, user=""):
+    """
+    Translates every file of the job folder in parallel and packs translated copies into single archive
+    :param output_l: code of target language or many codes separated with commas, e.g. "en,de,fr",
+                     variants of each language are put into their own folder of the archive
+    :param on_progress: callable receiving number of already translated files
+    :param user: owner of the files, previous versions of their documents are looked up among the user's ones
+    :return: tuple (path of the archive with translated files, whether the archive may be cached,
+             names of files in the archive translated partly by other engine than the primary one)
+    """
+    target_folder = os.path.join(workspace, "translated")
+    os.makedirs(target_folder, exist_ok=True)
+    archive_path = os.path.join(workspace, RESULT_ARCHIVE)
+
+    # Every job carries its own settings, so workers never share the language pair through global state
+    output_languages = output_l.split(",")
+    # Revised versions of documents translated before by the same user are translated incrementally
+    context = TranslationContext(input_l=input_l, output_l=output_languages[0], source_folder=workspace,
+                                 target_folder=target_folder, incremental=True, document_namespace=user)
+    # Files are fanned out across the process pool, segments repeated across files are translated once
+    # and files are extracted once for all target languages
+    translated = translate_files(list_workspace_files(workspace), get_file_executor(), context, output_languages)
+
+    # Open archive where translated files will be saved, each file is written as soon as it's translated
+    metrics = get_metrics()
+    cacheable = True
+    degraded = []
+    with zipfile.ZipFile(archive_path, "w") as translated_files:
+        for done, translated_file_coords in enumerate(translated, 1):
+            cacheable = cacheable and translated_file_coords['cacheable']
+            # Write translated file to archive and remove it as it is contained within the archive
+            arcname = translated_file_coords['translated_file']
+            if len(output_languages) > 1:
+                arcname = "/".join((translated_file_coords['output_l'], arcname))
+            if translated_file_coords['degraded']:
+                degraded.append(arcname)
+            with metrics.timer("pack"):
+                translated_files.write(translated_file_coords['translated_file_path'], arcname=arcname)
+            os.remove(translated_file_coords['translated_file_path'])
+            if on_progress is not None:
+                on_progress(done)
+
+    return archive_path, cacheable, sorted(degraded)
+
+
+def upload_result(archive_path, key):
+    # Identical archives are stored once, the key only points to their contents
+    with get_metrics().timer("upload"):
+        return get_storage().store_result(archive_path, key)
+
+
+def translate_job(job, on_progress=None):
+    """
+    Runs whole translation job taken from the queue: translation, upload of results and clean-up
+    :return: tuple (key of the uploaded archive, names of its degraded files, see translate_workspace)
+    """
+    key = result_key(job["user"], job["id"])
+    # Key of the result cache was computed from the uploads when the job was queued
+    cache_key = job.get("cache_key")
+    try:
+        # Same files may have been translated since the job was queued, e.g. when the user retried the upload,
+        # the job was counted as a miss of the result cache already when it was queued
+        if cache_key is not None and reuse_result(cache_key, key, count=False) is not None:
+            return key, []
+
+        archive_path, cacheable, degraded = translate_workspace(job["workspace"], job["input_l"], job["output_l"],
+                                                                on_progress, job["user"])
+        blob_key = upload_result(archive_path, key)
+        # Archives translated partly by engines whose translations mustn't be kept, e.g. on failover, aren't cached
+        if cache_key is not None and cacheable:
+            get_result_cache().put(cache_key, blob_key, os.path.getsize(archive_path))
+        return key, degraded
+    finally:
+        # Job folder is removed whether the job succeeded or failed, failed jobs are uploaded again by the user
+        rmtree(job["workspace"], ignore_errors=True)
@@ -0,0 +1,120 @@
+# Import builtin libs
+import time
+from hashlib import sha256
+# Import custom libs
+from utils import *
+from storage import get_storage
+from engines import get_translation_engine
+from metrics import get_metrics
+from sqlite_store import SQLiteStore, get_store
+
+
+def files_digest(file_hashes):
+    """
+    Hashes names and contents of the uploaded files, names are part of the digest as they are used in the archive
+    :param file_hashes: dictionary mapping names of the files to SHA-256 of their contents
+    """
+    digest = sha256()
+    for name in sorted(file_hashes):
+        digest.update(name.encode("UTF-8") + b"\x00" + file_hashes[name].encode("ASCII"))
+    return digest.hexdigest()
+
+
+class ResultCache(SQLiteStore):
+    """
+    Cache of whole translated archives, keyed on hash of the uploaded files, language pair and engine.
+    Entries point to the blobs of the storage, so repeated upload is answered with the archive stored before
+    and nothing is uploaded again. Least recently used entries are forgotten when the cache grows too big,
+    their blobs are removed by the storage sweeper once no result points to them.
+    """
+    def __init__(self, db_path: str = RESULT_CACHE_DB, max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+                 max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        super().__init__(db_path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.prepare_database()
+
+    def prepare_database(self):
+        conn = self.connection()
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS results ("
+                         "cache_key TEXT PRIMARY KEY, blob_key TEXT, size INTEGER, last_used REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+
+    @staticmethod
+    def cache_key(input_digest, input_l, output_l, engine):
+        return sha256("\x00".join((input_digest, input_l, output_l,
+                                   engine.name, engine.version)).encode("UTF-8")).hexdigest()
+
+    def get(self, cache_key):
+        """
+        :return: key of the blob with translated archive or None
+        """
+        conn = self.connection()
+        with conn:
+            row = conn.execute("SELECT blob_key FROM results WHERE cache_key = ?", (cache_key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE results SET last_used = ? WHERE cache_key = ?", (time.time(), cache_key))
+        return row[0]
+
+    def put(self, cache_key, blob_key, size):
+        conn = self.connection()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", (cache_key, blob_key, size, time.time()))
+            self.evict(conn)
+
+    def discard(self, cache_key):
+        conn = self.connection()
+        with conn:
+            conn.execute("DELETE FROM results WHERE cache_key = ?", (cache_key,))
+
+    def evict(self, conn):
+        entries, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        if entries <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+        # The least recently used entries go first until both limits are met
+        evicted = []
+        for cache_key, size in conn.execute("SELECT cache_key, size FROM results ORDER BY last_used"):
+            if entries <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            evicted.append((cache_key,))
+            entries -= 1
+            total_bytes -= size
+        conn.executemany("DELETE FROM results WHERE cache_key = ?", evicted)
+
+
+def result_cache_key(input_digest, input_l, output_l, engine_name: str = None):
+    """
+    Returns key of the job's result in the cache or None if translations of the engine aren't cached
+    :param input_digest: digest of the uploaded files made by files_digest
+    """
+    engine = get_translation_engine(engine_name)
+    if not engine.cacheable:
+        return None
+    return ResultCache.cache_key(input_digest, input_l, output_l, engine)
+
+
+def reuse_result(cache_key, key, count: bool = True):
+    """
+    Points the result key to the archive translated before from the same files
+    :param count: whether the lookup is counted in metrics, jobs are counted once when they are uploaded
+                  and not again when the worker looks the result up before translating
+    :return: key of the reused blob or None if there is no such archive
+    """
+    cache = get_result_cache()
+    blob_key = cache.get(cache_key)
+    # Blob may have been swept since it was cached, the cache then forgets it
+    if blob_key is not None:
+        try:
+            get_storage().link(blob_key, key)
+        except FileNotFoundError:
+            cache.discard(cache_key)
+            blob_key = None
+    if count:
+        get_metrics().increment("translation_result_cache_{}_total".format("misses" if blob_key is None else "hits"))
+    return blob_key
+
+
+def get_result_cache(db_path: str = RESULT_CACHE_DB):
+    return get_store(ResultCache, db_path)
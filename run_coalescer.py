@@ -0,0 +1,146 @@
+# Import builtin libs
+import codecs
+import re
+# Import custom libs
+from utils import *
+from metrics import get_metrics
+
+# Noise left by Word and PowerPoint which splits runs without changing the look of the text:
+# spell-check marks, revision session ids, rendering hints and spell-check state of run properties
+NOISE_ELEMENTS = {
+    "w": r"<w:proofErr\b[^>]*/>|<w:lastRenderedPageBreak/>",
+    "a": None,
+}
+NOISE_ATTRIBUTES = {
+    "w": r'\sw:rsid[A-Za-z]*="[^"]*"',
+    "a": r'\s(?:err|dirty|smtClean|smtId)="[^"]*"',
+}
+# Attributes of PowerPoint are removed only from run properties, elsewhere they may mean something else
+NOISE_ATTRIBUTES_SCOPE = {
+    "w": None,
+    "a": r"<a:(?:rPr|endParaRPr)\b[^>]*>",
+}
+
+
+class RunCoalescer:
+    """
+    Normalization of Word ("w") and PowerPoint ("a") parts done before the text is extracted.
+    Proofing and revision noise is removed and adjacent runs with identical properties are merged,
+    so a sentence split into many runs becomes a single text element and is translated as a whole.
+    Runs with different formatting survive, TextNodeRewriter joins their texts into one paragraph-level segment
+    and distributes its translation back over them.
+    """
+    def __init__(self, prefix: str, chunk_size: int = XML_CHUNK_SIZE):
+        self.prefix = prefix
+        self.chunk_size = chunk_size
+        self.paragraph_close = "</{}:p>".format(prefix)
+        self.noise_elements = re.compile(NOISE_ELEMENTS[prefix]) if NOISE_ELEMENTS[prefix] else None
+        self.noise_attributes = re.compile(NOISE_ATTRIBUTES[prefix])
+        self.noise_scope = re.compile(NOISE_ATTRIBUTES_SCOPE[prefix]) if NOISE_ATTRIBUTES_SCOPE[prefix] else None
+
+        run, properties, text = ("{}:{}".format(prefix, tag) for tag in ("r", "rPr", "t"))
+        properties_pattern = r"<{0}\b[^>]*/>|<{0}\b[^>]*>(?:(?!</{0}>).)*?</{0}>".format(properties)
+        # Run containing nothing but its properties and a single text element can be merged with its neighbours
+        simple_run = r"<{0}>(?P<properties>{1})?<{2}(?:\s[^>]*)?>(?P<text>[^<]*)</{2}></{0}>".format(
+            run, properties_pattern, text)
+        self.simple_run_pattern = re.compile(simple_run, re.DOTALL)
+        self.run_sequence_pattern = re.compile(r"(?:{0}){{2,}}".format(
+            simple_run.replace("?P<properties>", "?:").replace("?P<text>", "?:")), re.DOTALL)
+        # Merged text may start or end with a space, Word drops it without xml:space="preserve"
+        self.preserve_space = prefix == "w"
+        text_open = '<{} xml:space="preserve">'.format(text) if self.preserve_space else "<{}>".format(text)
+        self.merged_run = "<" + run + ">{}" + text_open + "{}</" + text + "></" + run + ">"
+        # Markup between text elements of two adjacent runs of the same paragraph, only formatting differs
+        self.run_boundary_pattern = re.compile(r"</{0}>\s*<{0}(?:\s[^>]*)?>\s*(?:{1})?\s*".format(
+            run, properties_pattern), re.DOTALL)
+
+    def merge_runs(self, match):
+        """
+        :return: tuple (merged sequence of runs, number of runs removed by merging)
+        """
+        merged = []
+        for run in self.simple_run_pattern.finditer(match.group(0)):
+            properties = run.group("properties") or ""
+            if merged and merged[-1][0] == properties:
+                merged[-1][1].append(run.group("text"))
+            else:
+                merged.append((properties, [run.group("text")]))
+        runs = sum(len(texts) for properties, texts in merged)
+        return "".join(self.merged_run.format(properties, "".join(texts)) for properties, texts in merged), \
+            runs - len(merged)
+
+    def normalize(self, xml, count_merges=False):
+        """
+        Normalizes piece of the part, it must not end in the middle of a paragraph
+        :param count_merges: whether merged runs are counted in metrics, part is normalized once
+                             for extraction and again for every written copy, only the first one is counted
+        """
+        if self.noise_elements is not None:
+            xml = self.noise_elements.sub("", xml)
+        if self.noise_scope is None:
+            xml = self.noise_attributes.sub("", xml)
+        else:
+            xml = self.noise_scope.sub(lambda match: self.noise_attributes.sub("", match.group(0)), xml)
+        removed_runs = 0
+
+        def merge(match):
+            nonlocal removed_runs
+            merged, removed = self.merge_runs(match)
+            removed_runs += removed
+            return merged
+
+        xml = self.run_sequence_pattern.sub(merge, xml)
+        if count_merges and removed_runs:
+            get_metrics().increment("translation_runs_merged_total", removed_runs)
+        return xml
+
+    def wrap(self, stream, count_merges=False):
+        return CoalescedStream(stream, self, count_merges)
+
+
+class CoalescedStream:
+    """
+    Binary file-like object reading normalized part from the source stream.
+    Runs never cross paragraphs, so the part is normalized in pieces ending with a closed paragraph
+    and memory use depends on the chunk size, not on the size of the part.
+    """
+    def __init__(self, source, coalescer: RunCoalescer, count_merges=False):
+        self.source = source
+        self.coalescer = coalescer
+        self.count_merges = count_merges
+        self.decoder = codecs.getincrementaldecoder("UTF-8")()
+        self.pending = ""
+        self.output = b""
+        self.finished = False
+
+    def fill(self):
+        chunk = self.source.read(self.coalescer.chunk_size)
+        if not chunk:
+            self.output += self.coalescer.normalize(self.pending + self.decoder.decode(b"", final=True),
+                                                    self.count_merges).encode("UTF-8")
+            self.pending = ""
+            self.finished = True
+            return
+        self.pending += self.decoder.decode(chunk)
+        cut = self.pending.rfind(self.coalescer.paragraph_close)
+        if cut != -1:
+            cut += len(self.coalescer.paragraph_close)
+            self.output += self.coalescer.normalize(self.pending[:cut], self.count_merges).encode("UTF-8")
+            self.pending = self.pending[cut:]
+
+    def read(self, size=-1):
+        while not self.finished and (size is None or size < 0 or len(self.output) < size):
+            self.fill()
+        if size is None or size < 0:
+            size = len(self.output)
+        data, self.output = self.output[:size], self.output[size:]
+        return data
+
+    def close(self):
+        self.source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,51 @@
+# Import custom libs
+from batching import SegmentBatcher
+
+
+class SegmentIndex:
+    """
+    Distinct segments of all files of a batch job. Segments are collected from every file before
+    any translation is requested, each distinct segment is translated once and its translation is fanned out
+    to all files containing it. Segments differing only in whitespace are treated as the same one.
+    """
+    def __init__(self):
+        self.segments = {}
+
+    @staticmethod
+    def normalize(segment):
+        return " ".join(segment.split())
+
+    def add(self, segments):
+        for segment in segments:
+            if segment is None:
+                continue
+            normalized = self.normalize(segment)
+            if normalized:
+                self.segments[normalized] = None
+
+    def __len__(self):
+        return len(self.segments)
+
+    def intersects(self, segments, normalized_segments):
+        """
+        Tells whether any of given segments of a single file is among the normalized ones, e.g. degraded ones
+        """
+        return any(self.normalize(segment) in normalized_segments for segment in segments if segment is not None)
+
+    def lookup(self, segments, translation: dict):
+        """
+        Returns translations of given segments of a single file, edge whitespace of each segment is kept
+        Segments left intact by translation (numbers, codes) are omitted, so files keep them byte for byte
+        :param translation: translations of the index to the target language, as made by SegmentTranslation
+        """
+        file_translation = {}
+        for segment in segments:
+            if segment is None:
+                continue
+            normalized = self.normalize(segment)
+            translated = translation.get(normalized)
+            if translated is None or translated == normalized:
+                continue
+            leading, core, trailing = SegmentBatcher.split_edge_whitespace(segment)
+            file_translation[segment] = leading + translated + trailing
+        return file_translation
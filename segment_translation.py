@@ -0,0 +1,108 @@
+# Import custom libs
+from batching import SegmentBatcher
+from async_client import get_translation_client
+from metrics import get_metrics
+
+
+class SegmentTranslation:
+    """
+    Translation of segments to the language pair of the context. Segments are deduplicated,
+    looked up in translation memory and the remaining ones are packed into batches translated
+    concurrently by the process-wide client. Used by translators of single files and by batch jobs.
+    """
+    def __init__(self, context):
+        self.context = context
+        # Engine and translation memory are shared by every translation in the process
+        self.engine = context.engine
+        self.translation_memory = context.translation_memory
+        # Batches are packed to the request limit of the engine in use
+        self.batcher = SegmentBatcher(self.engine.byte_limit)
+        # Segments translated by other engine than the primary one, e.g. glossary used on failover,
+        # their translations are degraded and never kept
+        self.degraded = set()
+
+    @property
+    def input_l(self):
+        return self.context.input_l
+
+    @property
+    def output_l(self):
+        return self.context.output_l
+
+    @property
+    def cacheable(self):
+        """
+        Tells whether every translation made so far may be kept, e.g. in result cache
+        """
+        return self.engine.cacheable and not self.degraded
+
+    def call_engine(self, text_input, fail_over_throttled=False):
+        """
+        :return: tuple (translated text, engine which translated it)
+        """
+        metrics = get_metrics()
+        metrics.increment("translation_characters_sent_total", len(text_input))
+        metrics.increment("translation_bytes_sent_total", len(text_input.encode("UTF-8")))
+        with metrics.timer("api"):
+            translated, engine = self.engine.translate_text_with_engine(text_input, self.input_l, self.output_l,
+                                                                        fail_over_throttled)
+        metrics.increment("translation_api_calls_total", engine=engine.name)
+        return translated, engine
+
+    def translate_batch(self, batch, fail_over_throttled=False):
+        """
+        :param fail_over_throttled: whether throttled primary engine is replaced with the next one of the chain,
+                                    otherwise throttling is raised, so the client backs off and retries the batch
+        :return: tuple (dictionary of segments of the batch and translations,
+                 whether all of them were translated by the primary engine)
+        """
+        engines = []
+
+        def request(text_input):
+            translated, engine = self.call_engine(text_input, fail_over_throttled)
+            engines.append(engine)
+            return translated
+
+        translation = self.batcher.translate_batch(batch, request)
+        return translation, all(engine is self.engine.primary for engine in engines)
+
+    def translate_batch_failing_over(self, batch):
+        """
+        Last attempt of the client, batch still throttled after all the backoffs is translated by the next engine
+        """
+        return self.translate_batch(batch, fail_over_throttled=True)
+
+    def translate(self, segments):
+        """
+        Translates list of segments, returns dictionary of segments and translations
+        """
+        # Segments are deduplicated and stripped of edge whitespace, the ones already present
+        # in translation memory aren't sent again
+        cores, parts = self.batcher.prepare(segments)
+        cacheable = self.engine.cacheable
+        translated_cores = self.translation_memory.get_many(cores, self.input_l, self.output_l) if cacheable else {}
+        if cacheable:
+            get_metrics().increment("translation_cache_hits_total", len(translated_cores))
+            get_metrics().increment("translation_cache_misses_total", len(cores) - len(translated_cores))
+        # Remaining segments are packed into batches that fit in the single request
+        # Batches are translated concurrently by the shared client, within its adaptive concurrency limit
+        # Client is taken only when something is translated, processes extracting and writing files never start it
+        batches = self.batcher.pack([core for core in cores if core not in translated_cores])
+        translation = {}
+        # Throttled batches are retried with backoff by the client, only the last attempt may fail over,
+        # batches translated by any engine but the primary one are degraded and aren't kept in translation memory
+        primary_translation = {}
+        for translated_batch, primary in get_translation_client().map_sync(
+                self.translate_batch, batches, fallback=self.translate_batch_failing_over):
+            translation.update(translated_batch)
+            if primary:
+                primary_translation.update(translated_batch)
+            else:
+                self.degraded.update(translated_batch)
+                get_metrics().increment("translation_degraded_segments_total", len(translated_batch))
+
+        if cacheable:
+            self.translation_memory.put_many(primary_translation, self.input_l, self.output_l)
+        translated_cores.update(translation)
+
+        return self.batcher.assemble(parts, translated_cores)
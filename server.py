@@ -1,34 +1,63 @@
 # Import builtin libs
 from datetime import datetime
 import json
+import logging
 import random
+import re
 import string
 import os
 
 # Import third-party libs
-from flask import Flask, render_template, redirect, url_for, session, request, send_from_directory, make_response, send_file
+from flask import Flask, render_template, redirect, url_for, session, request, make_response, send_file, \
+    jsonify, Response, stream_with_context
 from werkzeug.utils import secure_filename
 from tempfile import mkdtemp
-import boto3
-import zipfile
-import numpy as np
 
 # Import custom libs
-from translators import PresentationTranslator, WorkbookTranslator, DocumentTranslator
 from utils import *
-from shared_variables import SECRET_KEY, AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY
+from jobs import JobQueue, start_workers, JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED
+from storage import get_storage, result_key
+from result_cache import files_digest, result_cache_key, reuse_result
+from ingestion import IngestingRequest, UploadError, spool_upload
+from metrics import get_metrics, render_prometheus
+from shared_variables import SECRET_KEY
 
 
 app = Flask(__name__, static_folder="Static", template_folder="Templates")
+# Uploaded files are streamed into spools hashing and checking them, instead of plain temporary files
+app.request_class = IngestingRequest
 # Configure session to use filesystem (instead of signed cookies)
 app.config["SESSION_FILE_DIR"] = mkdtemp()
 app.config["SESSION_PERMANENT"] = True
 app.config["SESSION_TYPE"] = "filesystem"
 # Ensure templates are auto-reloaded
 app.config["TEMPLATES_AUTO_RELOAD"] = True
-app.config["UPLOAD_FOLDER"] = os.path.dirname(__file__)
+# Folders of the jobs are kept apart from the sources of the application
+app.config["JOBS_FOLDER"] = os.path.join(os.path.dirname(__file__), JOBS_FOLDER)
+os.makedirs(app.config["JOBS_FOLDER"], exist_ok=True)
 app.secret_key = SECRET_KEY
 
+job_queue = JobQueue()
+
+# Users are anonymous, their opaque ids are random strings with the prefix
+ANON_USER_PREFIX = "anon_"
+ANON_USERNAME_LEN = 16
+USER_ID_PATTERN = re.compile(r"{}[A-Za-z0-9]{{{}}}".format(ANON_USER_PREFIX, ANON_USERNAME_LEN))
+
+
+def current_user():
+    """
+    Returns id of the user sending the request or None if the user hasn't translated anything yet
+    """
+    user = session.get('user') or request.cookies.get(USER_COOKIE)
+    # Cookie of the older versions listed the user's translations, it started with the user id
+    if user is None and request.cookies.get("translated_files_list"):
+        user = request.cookies["translated_files_list"][0:len(ANON_USER_PREFIX) + ANON_USERNAME_LEN]
+    # Id is a part of the storage keys, so anything that doesn't look like an id is ignored
+    if user is None or not USER_ID_PATTERN.fullmatch(user):
+        return None
+    return user
+
 
 @app.route("/")
 def index():
@@ -43,117 +72,65 @@ def error():
 @app.route("/translate/<input_l>/<output_l>", methods=["GET", "POST"])
 def translate(input_l, output_l):
     if request.method == "GET":
+        # Many target languages may be given separated with commas, e.g. /translate/pl/en,de,fr
         return render_template("translate.html", language_pairs=LANGUAGE_PAIRS.values(),
-                               input_l=LANGUAGE_PAIRS[input_l], output_l=LANGUAGE_PAIRS[output_l])
+                               input_l=LANGUAGE_PAIRS[input_l],
+                               output_ls=[LANGUAGE_PAIRS[code] for code in output_l.split(",")])
     elif request.method == "POST":
-        new_input_l = CODE_PAIRS[request.form.get("input_l")]
-        new_output_l = CODE_PAIRS[request.form.get("output_l")]
-
-        # Using class methods change used language for each subsequent translation
-        # Changes in languages will be inherited by other classes (Doc and Xls translation class inherit
-        # translation method and its settings from the Presentation class)
-        PresentationTranslator.change_input_language(new_input_l=new_input_l)
-        PresentationTranslator.change_ouput_language(new_output_l=new_output_l)
-
-        files = request.files.getlist('files')
-
-        # Check if user sent any file
-        if files == "":
-            session["message"] = json.dumps("No file sent")
+        # Uploads are hashed and checked while the body is parsed, invalid ones stop the request at once
+        try:
+            new_input_l = CODE_PAIRS[request.form.get("input_l")]
+            files = [file for file in request.files.getlist('files') if file.filename != ""]
+            # Check if user sent any file
+            if not files:
+                session["message"] = json.dumps("No file sent")
+                return redirect(url_for("error"))
+            uploads = {}
+            for file in files:
+                # Write secured filename to the variable
+                upload = spool_upload(file)
+                upload.validate_package()
+                uploads[secure_filename(file.filename)] = upload
+        except UploadError as upload_error:
+            session["message"] = json.dumps(str(upload_error))
             return redirect(url_for("error"))
 
-        # Create temp folder for files and translated copies
-        # Pass temp folder by the class function, as Doc and Xls translation classes inherit from the Ppt
-        # there is only need to change it in the super class
-        temp_folder = ''.join(random.choices(string.ascii_letters + string.digits, k=16))
-        os.mkdir(os.path.join(app.config["UPLOAD_FOLDER"], temp_folder))
-        PresentationTranslator.change_temp_folder(new_temp_folder=temp_folder)
-
-        # Write files to the temporary folder
-        for file in files:
-            # Check if extension is correct
-            if "." not in file.filename or file.filename.rsplit(".", 1)[1].lower() not in ALLOWED_EXTENSIONS:
-                session["message"] = json.dumps("Wrong extension of sent files")
-                return redirect(url_for("error"))
-            # Write secured filename to the variable
-            filename = secure_filename(file.filename)
-            file.save(os.path.join(app.config["UPLOAD_FOLDER"], temp_folder, filename))
-
-        # Open archive where translated files will be saved
-        translated_files = zipfile.ZipFile(
-            os.path.join(app.config['UPLOAD_FOLDER'], temp_folder, "translated_files.zip"), "x")
-
-        # Iterate through every file in the folder and translate it choosing appropriate class
-        for f in [file for file in os.listdir(os.path.join(app.config["UPLOAD_FOLDER"], temp_folder))
-                  if os.path.isfile(os.path.join(app.config["UPLOAD_FOLDER"], temp_folder, file)) and
-                     os.path.splitext(os.path.join(app.config["UPLOAD_FOLDER"], temp_folder, file))[1] != ".zip"]:
-            file_type = os.path.splitext(f)[1]
-            if file_type == ".docx":
-                translate = DocumentTranslator(file_to_translate=f)
-                translated_file_coords = translate.main()
-            elif file_type == ".pptx":
-                translate = PresentationTranslator(file_to_translate=f)
-                translated_file_coords = translate.main()
-            elif file_type == ".xlsx":
-                translate = WorkbookTranslator(file_to_translate=f)
-                translated_file_coords = translate.main()
-            else:
-                raise RuntimeError("Wrong file extension")
-            # Remove source file for translation
-            os.remove(os.path.join(app.config["UPLOAD_FOLDER"], temp_folder, f))
-            # Write translated file to archive
-            translated_files.write(translated_file_coords['translated_file_path'],
-                                   arcname=translated_file_coords['translated_file'])
-            # Remove translated file as it is contained within the archive
-            os.remove(
-                os.path.join(app.config["UPLOAD_FOLDER"], temp_folder, translated_file_coords['translated_file_path']))
-
-        # Upload translated files to S3 bucket
-        # s3 = boto3.client(service_name='s3', region_name='us-east-1', use_ssl=True,
-        #                   aws_access_key_id=AWS_ACCESS_KEY_ID,
-        #                   aws_secret_access_key=AWS_SECRET_ACCESS_KEY
-        #                   )
-
-        # Configure resource
-        s3 = boto3.resource(service_name='s3', region_name='us-east-1', use_ssl=True,
-                            aws_access_key_id=AWS_ACCESS_KEY_ID,
-                            aws_secret_access_key=AWS_SECRET_ACCESS_KEY
-                            )
+        # Files are translated to every chosen language in one job, they are extracted only once
+        output_languages = [CODE_PAIRS[name] for name in request.form.getlist("output_l")] or output_l.split(",")
+        new_output_l = ",".join(dict.fromkeys(output_languages))
 
         # Create random user name for not logged users - they will have their own folders on S3
-        anon_username_len = 16
-        anon_user_prefix = "anon_"
-        try:
-            session['user']
-        except KeyError:
-            if request.cookies.get("translated_files_list"):
-                session['user'] = request.cookies["translated_files_list"][0:len(anon_user_prefix) + anon_username_len]
-            else:
-                random_string = random.choices(string.ascii_letters + string.digits, k=anon_username_len)
-                session['user'] = ''.join((anon_user_prefix, "".join(random_string)))
-
-        # Use resource to call Object object
-        s3_object = s3.Object(bucket_name="translatedfiles",
-                              key=str(session['user'] + "/" + temp_folder + "/" + "translated_files.zip"))
-        s3_object.upload_file(
-            os.path.join(app.config['UPLOAD_FOLDER'], temp_folder, "translated_files.zip"))
-
-        cookie = request.cookies.get("translated_files_list")
-
-        # Cookies have following format: <temp_folder for translation_1 (with username)>,<time of translation_1>,
-        # <temp_folder for translation_2>,<time of translation_2> etc.
-        # The first parameter allows to retrieve files from S3, time is used for listing
-        if not cookie:
-            res = make_response(redirect(url_for("translate", input_l=new_input_l, output_l=new_output_l)))
-            res.set_cookie("translated_files_list", session['user'] + '-' + temp_folder
-                           + "," + str(datetime.now()), 60 * 60 * 24 * 30)
-        else:
-            cookie += "," + session['user'] + '-' + temp_folder + "," + str(datetime.now())
-            print(cookie)
-            res = make_response(redirect(url_for("translate", input_l=new_input_l, output_l=new_output_l)))
-            res.set_cookie("translated_files_list", cookie, 60 * 60 * 24 * 30)
+        random_string = random.choices(string.ascii_letters + string.digits, k=ANON_USERNAME_LEN)
+        session['user'] = current_user() or ''.join((ANON_USER_PREFIX, "".join(random_string)))
 
-        # return redirect(url_for("translate", input_l=new_input_l, output_l=new_output_l))
+        # Job id is also the name of the folder with files waiting for translation
+        temp_folder = ''.join(random.choices(string.ascii_letters + string.digits, k=16))
+        files_total = len(files) * len(new_output_l.split(","))
+        # Files translated before are answered at once with the stored archive, they never reach the disk
+        cache_key = result_cache_key(files_digest({name: upload.hexdigest() for name, upload in uploads.items()}),
+                                     new_input_l, new_output_l)
+        key = result_key(session['user'], temp_folder)
+        if cache_key is not None and reuse_result(cache_key, key) is not None:
+            job_id = job_queue.add_done(session['user'], new_input_l, new_output_l, files_total, key,
+                                        job_id=temp_folder)
+        else:
+            # Workers run in other processes, spooled files are written once into the job folder
+            source_folder = os.path.join(app.config["JOBS_FOLDER"], temp_folder)
+            os.mkdir(source_folder)
+            for filename, upload in uploads.items():
+                upload.save(os.path.join(source_folder, filename))
+            # Translation, packing and upload to S3 are done by the worker processes, request returns immediately
+            job_id = job_queue.enqueue(session['user'], new_input_l, new_output_l, source_folder, files_total,
+                                       job_id=temp_folder, cache_key=cache_key)
+
+        # API clients get the job id to poll its status, browsers are sent to the list of translated files
+        if request.accept_mimetypes.best == "application/json":
+            res = make_response(jsonify(job_id=job_id, status=url_for("job_status", job_id=job_id)), 202)
+        else:
+            res = make_response(redirect(url_for("translated_files")))
+        # Cookie holds only the user id, history of the user's translations is kept with the jobs
+        res.set_cookie(USER_COOKIE, session['user'], USER_COOKIE_MAX_AGE)
+        res.delete_cookie("translated_files_list")
         return res
 
     else:
@@ -163,42 +140,95 @@ def translate(input_l, output_l):
 
 @app.route("/translated-files")
 def translated_files():
-    # Gather list of files and date from the cookie file
-    cookie = request.cookies.get("translated_files_list")
-    # If it's none then mark each column with a hyphen
-    if cookie is None:
-        files_array = np.array([["-", "-", "-"]])
-    # Convert list to array that can be easily used
-    else:
-        cookie = cookie.split(",")
-        files_array = np.array(cookie, dtype=str)
-        files_array = files_array.reshape((-1,2))
-        files_array = np.hstack((np.arange(files_array.shape[0]).reshape((files_array.shape[0],1)), files_array))
+    user = current_user()
+    status = request.args.get("status") or None
+    # Cursor of the page is given as <time of creation>_<job id> of the last job on the previous page
+    before = None
+    try:
+        created, job_id = request.args.get("before", "").split("_", 1)
+        before = (float(created), job_id)
+    except ValueError:
+        # Missing or malformed cursor shows the first page
+        pass
+
+    # Only the requested page is read from the index of jobs, however long the history of the user is
+    jobs, next_page = job_queue.history(user, before=before, status=status) if user else ([], None)
+    for job in jobs:
+        job["download"] = "{}-{}".format(job["user"], job["id"])
+        job["date"] = datetime.fromtimestamp(job["created"]).strftime("%Y-%m-%d %H:%M:%S")
 
     return render_template("translated_files.html",
-                           t_names=files_array[:, 0].tolist(),
-                           t_downloads=files_array[:, 1].tolist(),
-                           t_dates=files_array[:, 2].tolist(),
-                           length=len(files_array[:, 0].tolist()))
+                           jobs=jobs,
+                           status=status,
+                           statuses=(JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED),
+                           next_page="{!r}_{}".format(*next_page) if next_page else None,
+                           job_done=JOB_DONE)
+
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify(error="Unknown job"), 404
+    return jsonify(id=job["id"], status=job["status"], input_l=job["input_l"], output_l=job["output_l"],
+                   created=job["created"], started=job["started"], finished=job["finished"],
+                   # Files translated partly by fallback engine, e.g. when the primary one kept throttling
+                   degraded=json.loads(job["degraded"] or "[]"),
+                   progress=url_for("job_progress", job_id=job_id))
+
+
+@app.route("/jobs/<job_id>/progress")
+def job_progress(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify(error="Unknown job"), 404
+    return jsonify(status=job["status"], files_done=job["files_done"], files_total=job["files_total"])
+
+
+@app.route("/metrics")
+def metrics():
+    # Totals of finished jobs are collected by the workers, the server process adds its own counters
+    totals = job_queue.metrics_totals()
+    for key, value in get_metrics().snapshot().items():
+        totals[key] = totals.get(key, 0) + value
+    gauges = {'translation_jobs{{status="{}"}}'.format(status): count
+              for status, count in job_queue.count_by_status().items()}
+    hits = totals.get("translation_cache_hits_total", 0)
+    misses = totals.get("translation_cache_misses_total", 0)
+    if hits + misses:
+        gauges["translation_cache_hit_ratio"] = hits / (hits + misses)
+    return Response(render_prometheus(totals, gauges), mimetype="text/plain; version=0.0.4")
 
 
 @app.route("/download/<chosen_file>")
 def download(chosen_file):
-    # Create connection to s3
-    s3 = boto3.resource(service_name='s3', region_name='us-east-1', use_ssl=True,
-                        aws_access_key_id=AWS_ACCESS_KEY_ID,
-                        aws_secret_access_key=AWS_SECRET_ACCESS_KEY
-                        )
-
-    # Select specific bucket and download the file chosen by the user
     # Files are stored in the path user_name(contained in session data)/translation_name/translated_files.zip
-    s3.Bucket("translatedfiles").download_file(
-        Key=str(chosen_file.replace("-", "/") + "/" + "translated_files.zip"),
-        Filename=os.path.join(app.config["UPLOAD_FOLDER"], "download", "translated_files.zip"))
-
-    # Send saved file
-    return send_file(os.path.join(app.config["UPLOAD_FOLDER"], "download", "translated_files.zip"),
-                     attachment_filename="translated_files.zip")
-
+    key = "/".join((chosen_file.replace("-", "/"), RESULT_ARCHIVE))
+    storage = get_storage()
+    try:
+        blob_key = storage.resolve(key)
+        # Local storage is served straight from disk, the file is sent with sendfile where the server supports it
+        local_path = storage.local_path(blob_key)
+        if local_path is not None:
+            return send_file(local_path, mimetype="application/zip", as_attachment=True,
+                             attachment_filename=RESULT_ARCHIVE)
+        chunks, size = storage.open_stream(blob_key)
+    except FileNotFoundError:
+        session["message"] = json.dumps("Translated files not found")
+        return redirect(url_for("error"))
 
-app.run(port=4544, debug=True)
+    # Chunks of the stored archive are sent as soon as they arrive, nothing is saved on the server's disk
+    return Response(stream_with_context(chunks), mimetype="application/zip",
+                    headers={"Content-Disposition": "attachment; filename={}".format(RESULT_ARCHIVE),
+                             "Content-Length": str(size)})
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", LOG_LEVEL))
+    debug = os.environ.get("FLASK_DEBUG", "1") == "1"
+    # With the reloader the module is executed twice, workers are started only in the serving process
+    # Servers run by WSGI hosts don't execute this script, their workers are started with "python jobs.py"
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_workers()
+    # Requests don't share any translation state, so they are served by many threads at once
+    app.run(port=4544, debug=debug, threaded=True)
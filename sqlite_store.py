@@ -0,0 +1,46 @@
+# Import builtin libs
+import os
+import sqlite3
+import threading
+
+
+class SQLiteStore:
+    """
+    Base of stores kept in SQLite databases shared by threads and processes of the service.
+    SQLite connections can't be shared between threads nor forked processes,
+    thus each thread of each process opens its own one on first use.
+    """
+    # Settings of connections, stores may change them, e.g. to control transactions explicitly
+    isolation_level = ""
+    row_factory = None
+    pragmas = ("PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL")
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.local = threading.local()
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=self.isolation_level)
+            if self.row_factory is not None:
+                conn.row_factory = self.row_factory
+            for pragma in self.pragmas:
+                conn.execute(pragma)
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(store_class, db_path):
+    """
+    Returns store of the database shared by the whole process, it's created on first use
+    """
+    with _stores_lock:
+        if (store_class, db_path) not in _stores:
+            _stores[store_class, db_path] = store_class(db_path)
+        return _stores[store_class, db_path]
@@ -0,0 +1,377 @@
+# Import builtin libs
+import os
+import shutil
+import time
+from abc import ABC, abstractmethod
+from hashlib import sha256
+# Import custom libs
+from utils import *
+
+# Contents of archives are stored once under their hash, result keys only point to them
+BLOB_PREFIX = "blobs/"
+
+
+def result_key(user, job_id):
+    # Translated files are stored in the path user_name/job_id/translated_files.zip
+    return "/".join((user, job_id, RESULT_ARCHIVE))
+
+
+def hash_file(path, chunk_size: int = COPY_CHUNK_SIZE):
+    digest = sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Storage(ABC):
+    """
+    Storage of translated archives. Backends implement basic operations on objects,
+    content addressing and clean-up of expired results are built on top of them.
+    """
+    # Whether delete_stale never removes the object refreshed while it runs
+    atomic_delete_stale = False
+
+    @abstractmethod
+    def exists(self, key):
+        pass
+
+    @abstractmethod
+    def upload_file(self, path, key):
+        pass
+
+    @abstractmethod
+    def put_bytes(self, data, key):
+        pass
+
+    @abstractmethod
+    def get_bytes(self, key):
+        pass
+
+    @abstractmethod
+    def open_stream(self, key, chunk_size: int = DOWNLOAD_CHUNK_SIZE):
+        """
+        Opens stored object for reading without saving it anywhere
+        :return: tuple (iterator of chunks of the object, size of the object in bytes)
+        """
+        pass
+
+    @abstractmethod
+    def list_objects(self, prefix=""):
+        """
+        :return: iterator of tuples (key, time of the last modification as UNIX timestamp)
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, key):
+        pass
+
+    @abstractmethod
+    def touch(self, key):
+        """
+        Sets time of the last modification of the object to now
+        :raise FileNotFoundError: when there is no such object
+        """
+        pass
+
+    @abstractmethod
+    def modified(self, key):
+        """
+        :return: time of the last modification of the object as UNIX timestamp
+        """
+        pass
+
+    def delete_stale(self, key, before):
+        """
+        Removes the object unless it was modified since the given time
+        :return: whether the object was removed
+        """
+        if self.modified(key) >= before:
+            return False
+        self.delete(key)
+        return True
+
+    def local_path(self, key):
+        """
+        Returns path of the object on the local disk, so it can be sent with sendfile, or None for remote storage
+        """
+        return None
+
+    def store_result(self, path, key):
+        """
+        Stores archive under the key, identical archives are kept only once
+        :return: key of the blob holding contents of the archive
+        """
+        blob_key = BLOB_PREFIX + hash_file(path) + os.path.splitext(path)[1]
+        if not self.exists(blob_key):
+            self.upload_file(path, blob_key)
+        try:
+            self.link(blob_key, key)
+        except FileNotFoundError:
+            # Blob was swept after it was found, the fresh copy is kept by the sweeper for the grace period
+            self.upload_file(path, blob_key)
+            self.link(blob_key, key)
+        return blob_key
+
+    def link(self, blob_key, key):
+        """
+        Stores result pointing to the blob which is already stored
+        :raise FileNotFoundError: when the blob was removed by the sweeper, the result isn't kept then
+        """
+        # Refreshed blob is kept by the sweeper for the grace period, however old it was
+        self.touch(blob_key)
+        self.put_bytes(blob_key.encode("UTF-8"), key)
+        # Storage checking and removing stale blobs in separate calls may remove the blob refreshed in between
+        if not self.atomic_delete_stale and not self.exists(blob_key):
+            self.delete(key)
+            raise FileNotFoundError(blob_key)
+
+    def resolve(self, key):
+        """
+        Returns key of the blob the result points to
+        """
+        return self.get_bytes(key).decode("UTF-8")
+
+    def sweep(self, ttl: int = RESULT_TTL, grace: int = BLOB_GRACE_PERIOD):
+        """
+        Removes results older than ttl and blobs no longer pointed to by any result
+        :return: tuple (number of removed results, number of removed blobs)
+        """
+        now = time.time()
+        removed_results = 0
+        referenced = set()
+        for key, modified in list(self.list_objects()):
+            if key.startswith(BLOB_PREFIX):
+                continue
+            try:
+                if modified < now - ttl:
+                    self.delete(key)
+                    removed_results += 1
+                else:
+                    referenced.add(self.resolve(key))
+            except FileNotFoundError:
+                continue
+        # Blobs are stored or refreshed before the results pointing to them are written, so results written
+        # since they were read point only to fresh blobs, which are left for the grace period
+        removed_blobs = 0
+        for key, modified in list(self.list_objects(BLOB_PREFIX)):
+            if key in referenced or modified >= now - grace:
+                continue
+            # Blob may have been refreshed since it was listed, its time is checked again when it's removed
+            try:
+                if self.delete_stale(key, now - grace):
+                    removed_blobs += 1
+            except FileNotFoundError:
+                continue
+        return removed_results, removed_blobs
+
+
+class S3Storage(Storage):
+    """
+    Storage of translated archives in S3 bucket
+    """
+    def __init__(self, bucket: str = RESULTS_BUCKET):
+        self.bucket = bucket
+        self.transfer_config = None
+
+    @staticmethod
+    def client():
+        # Client is imported here, so the local storage works without AWS libraries and credentials
+        from aws_clients import get_aws_client
+        return get_aws_client("s3")
+
+    def exists(self, key):
+        client = self.client()
+        try:
+            client.head_object(Bucket=self.bucket, Key=key)
+        except client.exceptions.ClientError as error:
+            if error.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                return False
+            raise
+        return True
+
+    def upload_file(self, path, key):
+        if self.transfer_config is None:
+            from boto3.s3.transfer import TransferConfig
+            # Multipart transfers split big archives into parts sent concurrently over the pooled connections
+            self.transfer_config = TransferConfig(multipart_threshold=S3_MULTIPART_THRESHOLD,
+                                                  multipart_chunksize=S3_MULTIPART_CHUNKSIZE,
+                                                  max_concurrency=S3_TRANSFER_CONCURRENCY,
+                                                  use_threads=True)
+        self.client().upload_file(path, self.bucket, key, Config=self.transfer_config)
+
+    def put_bytes(self, data, key):
+        self.client().put_object(Bucket=self.bucket, Key=key, Body=data)
+
+    def get_object(self, key):
+        client = self.client()
+        try:
+            return client.get_object(Bucket=self.bucket, Key=key)
+        except client.exceptions.NoSuchKey:
+            raise FileNotFoundError(key)
+
+    def get_bytes(self, key):
+        body = self.get_object(key)["Body"]
+        with body:
+            return body.read()
+
+    def open_stream(self, key, chunk_size: int = DOWNLOAD_CHUNK_SIZE):
+        response = self.get_object(key)
+        body = response["Body"]
+
+        def chunks():
+            try:
+                for chunk in body.iter_chunks(chunk_size):
+                    yield chunk
+            finally:
+                body.close()
+
+        return chunks(), response["ContentLength"]
+
+    def list_objects(self, prefix=""):
+        paginator = self.client().get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for item in page.get("Contents", []):
+                yield item["Key"], item["LastModified"].timestamp()
+
+    def delete(self, key):
+        self.client().delete_object(Bucket=self.bucket, Key=key)
+
+    def touch(self, key):
+        client = self.client()
+        # Object copied onto itself gets new time of the last modification, the copy is made by S3 itself
+        try:
+            client.copy_object(Bucket=self.bucket, Key=key, CopySource={"Bucket": self.bucket, "Key": key},
+                               MetadataDirective="REPLACE")
+        except client.exceptions.ClientError as error:
+            if error.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                raise FileNotFoundError(key)
+            raise
+
+    def modified(self, key):
+        client = self.client()
+        try:
+            return client.head_object(Bucket=self.bucket, Key=key)["LastModified"].timestamp()
+        except client.exceptions.ClientError as error:
+            if error.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                raise FileNotFoundError(key)
+            raise
+
+
+class FileSystemStorage(Storage):
+    """
+    Storage of translated archives in a local folder or NFS mount, used by on-premise deployments and tests
+    """
+    atomic_delete_stale = True
+
+    def __init__(self, root: str = LOCAL_STORAGE_FOLDER):
+        self.root = root
+
+    def path(self, key):
+        path = os.path.normpath(os.path.join(self.root, key))
+        # Keys come from the requests, they mustn't lead outside of the storage folder
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise FileNotFoundError(key)
+        return path
+
+    def exists(self, key):
+        return os.path.isfile(self.path(key))
+
+    def replace_with(self, write, key):
+        # Object appears under its key only when it's complete, also on NFS
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temporary = "{}.{}.part".format(target, os.getpid())
+        write(temporary)
+        os.replace(temporary, target)
+
+    def upload_file(self, path, key):
+        self.replace_with(lambda temporary: shutil.copyfile(path, temporary), key)
+
+    def put_bytes(self, data, key):
+        def write(temporary):
+            with open(temporary, "wb") as target:
+                target.write(data)
+        self.replace_with(write, key)
+
+    def get_bytes(self, key):
+        with open(self.path(key), "rb") as source:
+            return source.read()
+
+    def open_stream(self, key, chunk_size: int = DOWNLOAD_CHUNK_SIZE):
+        path = self.path(key)
+        size = os.path.getsize(path)
+        source = open(path, "rb")
+
+        def chunks():
+            with source:
+                for chunk in iter(lambda: source.read(chunk_size), b""):
+                    yield chunk
+
+        return chunks(), size
+
+    def list_objects(self, prefix=""):
+        for directory, folders, files in os.walk(self.root):
+            for name in files:
+                if name.endswith((".part", ".deleting")):
+                    continue
+                path = os.path.join(directory, name)
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    yield key, os.path.getmtime(path)
+
+    def delete(self, key):
+        os.remove(self.path(key))
+        self.remove_empty_folders(key)
+
+    def remove_empty_folders(self, key):
+        # Folders of users and jobs are removed together with their last result
+        directory = os.path.dirname(self.path(key))
+        while directory != os.path.normpath(self.root):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+
+    def touch(self, key):
+        os.utime(self.path(key))
+
+    def modified(self, key):
+        return os.path.getmtime(self.path(key))
+
+    def delete_stale(self, key, before):
+        # Object is moved aside before its time is checked, so it's either refreshed before the move and put back,
+        # or it can't be refreshed any more and the refreshing link stores it again
+        path = self.path(key)
+        tombstone = "{}.{}.deleting".format(path, os.getpid())
+        os.rename(path, tombstone)
+        if os.path.getmtime(tombstone) >= before:
+            os.replace(tombstone, path)
+            return False
+        os.remove(tombstone)
+        self.remove_empty_folders(key)
+        return True
+
+    def local_path(self, key):
+        return self.path(key)
+
+
+STORAGE_BACKENDS = {
+    "s3": S3Storage,
+    "local": FileSystemStorage,
+}
+
+_storage = None
+
+
+def get_storage():
+    """
+    Returns storage of translated archives used by the current process, backend is chosen by STORAGE_BACKEND
+    which may be overridden with the environment variable of the same name
+    """
+    global _storage
+    if _storage is None:
+        _storage = STORAGE_BACKENDS[os.environ.get("STORAGE_BACKEND", STORAGE_BACKEND)]()
+    return _storage
@@ -0,0 +1,6 @@
+# Import builtin libs
+import os
+import sys
+
+# Modules of the application live in the root folder of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,58 @@
+# Import builtin libs
+import threading
+# Import third-party libs
+import pytest
+# Import custom libs
+from async_client import AsyncTranslationClient, configure_translation_client, get_translation_client
+from engines import EngineError
+
+
+def test_map_sync_keeps_order_and_retries_throttled_calls():
+    client = AsyncTranslationClient(max_concurrency=4, max_retries=3)
+    attempts = {}
+    lock = threading.Lock()
+
+    def translate(text):
+        with lock:
+            attempts[text] = attempts.get(text, 0) + 1
+            if attempts[text] == 1 and text == "b":
+                raise EngineError("Rate exceeded", code="ThrottlingException")
+        return text.upper()
+
+    try:
+        assert client.map_sync(translate, ["a", "b", "c"]) == ["A", "B", "C"]
+        assert attempts == {"a": 1, "b": 2, "c": 1}
+        # Other errors aren't retried
+        with pytest.raises(ValueError):
+            client.map_sync(int, ["x"])
+    finally:
+        client.close()
+
+
+def test_fallback_is_called_in_the_last_attempt_only():
+    client = AsyncTranslationClient(max_concurrency=2, max_retries=1)
+    calls = []
+
+    def throttled(text):
+        calls.append(text)
+        raise EngineError("Rate exceeded", code="ThrottlingException")
+
+    try:
+        assert client.map_sync(throttled, ["a"], fallback=str.upper) == ["A"]
+        assert calls == ["a"]
+        assert client.map_sync(str.lower, ["B"], fallback=str.upper) == ["b"]
+    finally:
+        client.close()
+
+
+def test_configured_client_replaces_previous_one_without_leaking_threads():
+    previous = configure_translation_client(3)
+    assert configure_translation_client(3) is previous
+    threads = threading.active_count()
+    for max_concurrency in (4, 5, 6):
+        client = configure_translation_client(max_concurrency)
+        assert client.map_sync(str.upper, ["a", "b"]) == ["A", "B"]
+    assert not previous.loop_thread.is_alive()
+    assert get_translation_client() is client and client.max_concurrency == 6
+    # Loop thread and the worker threads of the replaced clients are stopped
+    assert threading.active_count() <= threads + 2
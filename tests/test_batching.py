@@ -0,0 +1,54 @@
+# Import custom libs
+from utils import BATCH_SENTINEL
+from batching import SegmentBatcher
+
+
+def test_pack_respects_byte_limit():
+    batcher = SegmentBatcher(byte_limit=40)
+    segments = ["Ala ma kota", "Zażółć gęślą", "x" * 100, "Pies", "Kot " + BATCH_SENTINEL, "Mysz"]
+    batches = batcher.pack(segments)
+    # Every segment is sent exactly once
+    assert sorted(segment for batch in batches for segment in batch) == sorted(segments)
+    for batch in batches:
+        if len(batch) > 1:
+            assert len(batcher.join(batch).encode("UTF-8")) <= batcher.byte_limit
+    # Too long segments and segments containing the sentinel go alone
+    assert ["x" * 100] in batches
+    assert ["Kot " + BATCH_SENTINEL] in batches
+
+
+def test_prepare_and_assemble_keep_edge_whitespace():
+    batcher = SegmentBatcher()
+    segments = ["  Ala ma kota ", "Ala ma kota", "2024-01-01", None, "  Ala ma kota "]
+    cores, parts = batcher.prepare(segments)
+    # Duplicates are translated once, segments without letters aren't translated at all
+    assert cores == ["Ala ma kota"]
+    translation = batcher.assemble(parts, {"Ala ma kota": "Alice has a cat"})
+    assert translation == {"  Ala ma kota ": "  Alice has a cat ", "Ala ma kota": "Alice has a cat",
+                           "2024-01-01": "2024-01-01"}
+
+
+def test_translate_batch_splits_translation():
+    batcher = SegmentBatcher()
+    requests = []
+
+    def request(text):
+        requests.append(text)
+        return text.upper()
+
+    assert batcher.translate_batch(["one", "two", "three"], request) == {"one": "ONE", "two": "TWO",
+                                                                          "three": "THREE"}
+    assert len(requests) == 1
+
+
+def test_translate_batch_falls_back_to_single_segments():
+    batcher = SegmentBatcher()
+    requests = []
+
+    def request(text):
+        requests.append(text)
+        # Service merging the lines loses the sentinels, pieces can't be matched with segments
+        return text.replace(BATCH_SENTINEL, "").upper()
+
+    assert batcher.translate_batch(["one", "two"], request) == {"one": "ONE", "two": "TWO"}
+    assert requests[1:] == ["one", "two"]
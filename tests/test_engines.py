@@ -0,0 +1,86 @@
+# Import builtin libs
+import json
+# Import third-party libs
+import pytest
+# Import custom libs
+from utils import ENGINE_UNAVAILABLE_CODE
+from engines import EngineError, GlossaryEngine, FailoverEngine, MockEngine, TranslationEngine, create_engine
+from metrics import get_metrics
+
+GLOSSARY = {"pl-en": {"Dzień dobry": "Good morning", "dobry": "good", "kot": "cat"}}
+
+
+class FailingEngine(TranslationEngine):
+    name = "failing"
+    max_concurrency = 4
+
+    def __init__(self, code):
+        self.code = code
+        self.calls = 0
+
+    def translate_text(self, text, input_l, output_l):
+        self.calls += 1
+        raise EngineError("Engine failed", code=self.code)
+
+
+def test_glossary_replaces_whole_terms_longest_first():
+    engine = GlossaryEngine(GLOSSARY)
+    assert engine.translate_text("Dzień dobry, kot jest dobry", "pl", "en") == "Good morning, cat jest good"
+    # Terms inside other words are left intact
+    assert engine.translate_text("kotlet", "pl", "en") == "kotlet"
+
+
+def test_glossary_without_language_pair_returns_text():
+    engine = GlossaryEngine(GLOSSARY)
+    assert engine.translate_text("Dzień dobry", "pl", "de") == "Dzień dobry"
+    assert engine.translate_text_with_engine("kot", "pl", "en") == ("cat", engine)
+
+
+def test_glossary_is_loaded_from_file(tmp_path):
+    glossary_file = tmp_path / "glossary.json"
+    glossary_file.write_text(json.dumps(GLOSSARY), encoding="UTF-8")
+    assert GlossaryEngine(glossary_file=str(glossary_file)).translate_text("kot", "pl", "en") == "cat"
+    assert GlossaryEngine(glossary_file=str(tmp_path / "missing.json")).translate_text("kot", "pl", "en") == "kot"
+
+
+def test_failover_to_glossary_when_primary_is_unavailable():
+    primary = FailingEngine(ENGINE_UNAVAILABLE_CODE)
+    glossary = GlossaryEngine(GLOSSARY)
+    engine = FailoverEngine([primary, glossary])
+    assert engine.translate_text_with_engine("kot", "pl", "en") == ("cat", glossary)
+    assert primary.calls == 1
+    # Limits fit every engine of the chain, translation memory follows the primary engine
+    assert engine.max_concurrency == primary.max_concurrency
+    assert engine.cacheable
+
+
+def test_throttling_is_raised_to_the_client_before_failover():
+    primary = FailingEngine("ThrottlingException")
+    engine = FailoverEngine([primary, GlossaryEngine(GLOSSARY)])
+    assert engine.primary is primary
+    # Client backs off and retries throttled calls, the next engine is asked only when it gives up
+    with pytest.raises(EngineError):
+        engine.translate_text_with_engine("kot", "pl", "en")
+    assert engine.translate_text_with_engine("kot", "pl", "en", fail_over_throttled=True)[0] == "cat"
+
+
+def test_failover_records_throttling():
+    metrics = get_metrics()
+    metrics.drain()
+    engine = FailoverEngine([FailingEngine("ThrottlingException"), GlossaryEngine(GLOSSARY)])
+    assert engine.translate_text("kot", "pl", "en") == "cat"
+    assert metrics.drain().get("translation_api_throttled_total") == 1
+
+
+def test_failover_raises_other_errors():
+    engine = FailoverEngine([FailingEngine("ValidationException"), GlossaryEngine(GLOSSARY)])
+    with pytest.raises(EngineError):
+        engine.translate_text("kot", "pl", "en")
+
+
+def test_create_engine():
+    assert isinstance(create_engine("glossary"), GlossaryEngine)
+    engine = create_engine("mock,glossary")
+    assert isinstance(engine, FailoverEngine)
+    assert [type(member) for member in engine.engines] == [MockEngine, GlossaryEngine]
+    assert engine.name == "mock,glossary"
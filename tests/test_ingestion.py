@@ -0,0 +1,53 @@
+# Import builtin libs
+import io
+import zipfile
+# Import third-party libs
+import pytest
+
+pytest.importorskip("flask")
+# Import custom libs
+from ingestion import UploadError, UploadSpool
+
+
+def make_package(*names):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name in names:
+            archive.writestr(name, "<xml/>")
+    return buffer.getvalue()
+
+
+def upload(filename, data, chunk_size=3, **kwargs):
+    spool = UploadSpool(filename, **kwargs)
+    for start in range(0, len(data), chunk_size):
+        spool.write(data[start:start + chunk_size])
+    return spool
+
+
+def test_valid_package_is_accepted_and_hashed():
+    data = make_package("[Content_Types].xml", "word/document.xml")
+    spool = upload("report.DOCX", data)
+    spool.validate_package()
+    assert spool.size == len(data)
+    assert spool.read() == data
+
+
+def test_wrong_extension_is_rejected_before_content():
+    with pytest.raises(UploadError):
+        UploadSpool("notes.txt")
+
+
+def test_content_which_isnt_zip_is_rejected_on_first_bytes():
+    with pytest.raises(UploadError):
+        upload("slides.pptx", b"%PDF-1.7 not a presentation")
+
+
+def test_too_big_file_is_rejected():
+    with pytest.raises(UploadError):
+        upload("slides.pptx", make_package("[Content_Types].xml"), max_file_size=10)
+
+
+def test_package_without_main_part_is_rejected():
+    spool = upload("book.xlsx", make_package("[Content_Types].xml", "word/document.xml"))
+    with pytest.raises(UploadError):
+        spool.validate_package()
@@ -0,0 +1,74 @@
+# Import builtin libs
+import time
+# Import third-party libs
+import pytest
+# Import custom libs
+from jobs import JobQueue, JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_jobs_are_claimed_once_oldest_first(queue):
+    first = queue.enqueue("user", "pl", "en", "/jobs/first", 1)
+    second = queue.enqueue("user", "pl", "en", "/jobs/second", 2)
+    # Other workers open their own connections to the same database
+    other = JobQueue(queue.db_path)
+    assert queue.claim()["id"] == first
+    job = other.claim()
+    assert job["id"] == second and job["status"] == JOB_RUNNING and job["workspace"] == "/jobs/second"
+    assert queue.claim() is None
+    assert queue.get(first)["status"] == JOB_RUNNING
+
+
+def test_finished_jobs_keep_metrics_and_totals(queue):
+    done = queue.enqueue("user", "pl", "en", "/jobs/done", 1)
+    failed = queue.enqueue("user", "pl", "en", "/jobs/failed", 1)
+    queue.claim()
+    queue.claim()
+    queue.complete(done, "user/done/translated_files.zip", {"translation_api_calls_total": 3})
+    queue.fail(failed, "Traceback", {"translation_api_calls_total": 2})
+    assert queue.get(done)["status"] == JOB_DONE
+    assert queue.get(done)["result_key"] == "user/done/translated_files.zip"
+    assert queue.get(failed)["status"] == JOB_FAILED and queue.get(failed)["error"] == "Traceback"
+    assert queue.metrics_totals() == {"translation_api_calls_total": 5}
+    assert queue.count_by_status() == {JOB_DONE: 1, JOB_FAILED: 1}
+
+
+def test_stale_jobs_are_requeued(queue):
+    job_id = queue.enqueue("user", "pl", "en", "/jobs/stale", 1)
+    queue.claim()
+    # Job of the living worker is left alone, the one running for longer than the timeout is put back
+    queue.requeue_stale(timeout=60)
+    assert queue.get(job_id)["status"] == JOB_RUNNING
+    queue.connection().execute("UPDATE jobs SET started = ?", (time.time() - 120,))
+    queue.requeue_stale(timeout=60)
+    assert queue.get(job_id)["status"] == JOB_QUEUED
+    assert queue.claim()["id"] == job_id
+
+
+def test_history_is_paginated_with_cursor_newest_first(queue):
+    for i in range(5):
+        queue.enqueue("user", "pl", "en", "/jobs/{}".format(i), 1, job_id="job{}".format(i))
+    queue.enqueue("other", "pl", "en", "/jobs/other", 1)
+    # Jobs created at the same moment are ordered by id, so no job is skipped nor repeated between pages
+    queue.connection().execute("UPDATE jobs SET created = 100 WHERE id IN ('job1', 'job2', 'job3')")
+    queue.connection().execute("UPDATE jobs SET created = 200 WHERE id = 'job4'")
+    queue.connection().execute("UPDATE jobs SET created = 50 WHERE id = 'job0'")
+    queue.connection().execute("UPDATE jobs SET status = ? WHERE id IN ('job0', 'job2')", (JOB_DONE,))
+
+    pages = []
+    cursor = None
+    while True:
+        jobs, cursor = queue.history("user", limit=2, before=cursor)
+        pages.append([job["id"] for job in jobs])
+        if cursor is None:
+            break
+    assert pages == [["job4", "job3"], ["job2", "job1"], ["job0"]]
+
+    jobs, cursor = queue.history("user", limit=1, status=JOB_DONE)
+    assert [job["id"] for job in jobs] == ["job2"]
+    jobs, cursor = queue.history("user", limit=1, before=cursor, status=JOB_DONE)
+    assert [job["id"] for job in jobs] == ["job0"] and cursor is None
@@ -0,0 +1,52 @@
+# Import third-party libs
+import pytest
+# Import custom libs
+import manifests
+from context import TranslationContext
+from manifests import ManifestStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(manifests, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def context():
+    return TranslationContext(input_l="pl", output_l="en", engine_name="glossary", document_namespace="user")
+
+
+def test_unchanged_segments_of_revised_version_are_reused(tmp_path, clock, context):
+    store = ManifestStore(str(tmp_path / "manifests.sqlite3"))
+    store.update(context, {"report.docx": ["Ala ma kota", " Pies ", None]},
+                 {"Ala ma kota": "Alice has a cat", "Pies": "Dog"})
+    # Revised version changed one segment, whitespace differences don't matter
+    revised = {"report.docx": ["Ala  ma kota", "Pies i kot"]}
+    assert store.reuse(context, revised) == {"Ala ma kota": "Alice has a cat"}
+    # Documents of other users and other target languages are never mixed
+    assert store.reuse(context.evolve(document_namespace="other"), revised) == {}
+    assert store.reuse(context.evolve(output_l="de"), revised) == {}
+
+
+def test_unused_and_least_recently_used_manifests_are_evicted(tmp_path, clock, context):
+    store = ManifestStore(str(tmp_path / "manifests.sqlite3"), max_segments=3, ttl=100)
+    translation = {"Jeden": "One", "Dwa": "Two"}
+    for file_name in ("old.docx", "first.docx", "second.docx"):
+        store.update(context, {file_name: list(translation)}, translation)
+        clock.now += 60
+    # Reading the manifest marks it as used
+    assert store.reuse(context, {"first.docx": ["Jeden"]}) == {"Jeden": "One"}
+    store.evict()
+    # Old one expired, second one doesn't fit next to the more recently used first one
+    assert store.reuse(context, {"old.docx": ["Jeden"], "second.docx": ["Jeden"]}) == {}
+    assert store.reuse(context, {"first.docx": ["Dwa"]}) == {"Dwa": "Two"}
@@ -0,0 +1,119 @@
+# Import builtin libs
+import io
+import zipfile
+# Import custom libs
+from ooxml_package import discover_text_parts, extract_texts, resolve_slide_parts, rewrite_parts, \
+    SPREADSHEET_TEXT_CONTENT_TYPES, SPREADSHEET_TEXT_RELATIONSHIP_TYPES
+from ooxml_rewriter import TextNodeRewriter
+
+WORD_MAIN = "application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"
+WORD_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.{}+xml"
+SPREADSHEET_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.{}+xml"
+RELATIONSHIP_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/{}"
+
+
+def content_types(overrides):
+    return ('<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="png" ContentType="image/png"/>'
+            + "".join('<Override PartName="/{}" ContentType="{}"/>'.format(name, content_type)
+                      for name, content_type in overrides.items())
+            + '</Types>')
+
+
+def relationships(targets):
+    return ('<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + "".join('<Relationship Id="{}" Type="{}" Target="{}"{}/>'.format(
+                rel_id, RELATIONSHIP_TYPE.format(rel_type), target,
+                ' TargetMode="External"' if target.startswith("http") else "")
+                for rel_id, rel_type, target in targets)
+            + '</Relationships>')
+
+
+def make_package(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return zipfile.ZipFile(buffer)
+
+
+def test_word_parts_are_found_by_relationships_and_content_types():
+    # Headers and footers have names Word never uses, one comments part isn't related to anything
+    archive = make_package({
+        "[Content_Types].xml": content_types({
+            "doc/main.xml": WORD_MAIN, "doc/top.xml": WORD_TYPE.format("header"),
+            "doc/bottom.xml": WORD_TYPE.format("footer"), "doc/notes.xml": WORD_TYPE.format("comments")}),
+        "_rels/.rels": relationships([("rId1", "officeDocument", "doc/main.xml")]),
+        "doc/main.xml": "<w:document/>",
+        "doc/_rels/main.xml.rels": relationships([
+            ("rId1", "footer", "bottom.xml"), ("rId2", "header", "/doc/top.xml"), ("rId3", "image", "media/a.png"),
+            ("rId4", "hyperlink", "http://example.com")]),
+        "doc/top.xml": "<w:hdr/>",
+        "doc/bottom.xml": "<w:ftr/>",
+        "doc/notes.xml": "<w:comments/>",
+        "doc/media/a.png": b"\x89PNG",
+    })
+    assert discover_text_parts(archive) == ["doc/main.xml", "doc/bottom.xml", "doc/top.xml", "doc/notes.xml"]
+
+
+def test_slides_follow_the_order_of_the_deck():
+    slide_ids = '<p:sldId r:id="rId2"/><p:sldId r:id="rId9"/><p:sldId r:id="rId3"/>'
+    archive = make_package({
+        "_rels/.rels": relationships([("rId1", "officeDocument", "ppt/presentation.xml")]),
+        "ppt/presentation.xml": (
+            '<p:presentation xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            '<p:sldIdLst>{}</p:sldIdLst></p:presentation>'.format(slide_ids)),
+        "ppt/_rels/presentation.xml.rels": relationships([
+            ("rId2", "slide", "slides/intro.xml"), ("rId3", "slide", "slides/slide1.xml"),
+            ("rId9", "slide", "slides/missing.xml")]),
+        "ppt/slides/intro.xml": "<p:sld/>",
+        "ppt/slides/slide1.xml": "<p:sld/>",
+    })
+    assert resolve_slide_parts(archive) == ["ppt/slides/intro.xml", "ppt/slides/slide1.xml"]
+
+
+def make_workbook():
+    return make_package({
+        "[Content_Types].xml": content_types({
+            "xl/workbook.xml": SPREADSHEET_TYPE.format("sheet.main"),
+            "xl/sharedStrings.xml": SPREADSHEET_TYPE.format("sharedStrings"),
+            "xl/worksheets/sheet1.xml": SPREADSHEET_TYPE.format("worksheet"),
+            "xl/comments1.xml": SPREADSHEET_TYPE.format("comments"),
+            "xl/styles.xml": SPREADSHEET_TYPE.format("styles")}),
+        "_rels/.rels": relationships([("rId1", "officeDocument", "xl/workbook.xml")]),
+        "xl/workbook.xml": "<workbook/>",
+        "xl/_rels/workbook.xml.rels": relationships([
+            ("rId1", "worksheet", "worksheets/sheet1.xml"), ("rId2", "sharedStrings", "sharedStrings.xml"),
+            ("rId3", "styles", "styles.xml")]),
+        "xl/sharedStrings.xml": '<sst><si><t>Kot</t></si><si><t>2024</t></si></sst>',
+        "xl/worksheets/sheet1.xml": ('<worksheet><sheetData><row>'
+                                     '<c r="A1" t="s"><v>0</v></c>'
+                                     '<c r="B1" t="inlineStr"><is><t>Pies</t></is></c>'
+                                     '<c r="C1"><f>SUM(1,2)</f><v>3</v></c>'
+                                     '</row></sheetData></worksheet>'),
+        "xl/worksheets/_rels/sheet1.xml.rels": relationships([("rId1", "comments", "../comments1.xml")]),
+        "xl/comments1.xml": '<comments><commentList><comment ref="A1"><text><r><rPr><b/></rPr><t>Uwaga</t></r>'
+                            '</text></comment></commentList></comments>',
+        "xl/styles.xml": '<styleSheet><fonts><font><name val="Calibri"/></font></fonts></styleSheet>',
+    })
+
+
+def test_workbook_inline_strings_and_comments_are_translated():
+    archive = make_workbook()
+    parts = discover_text_parts(archive, SPREADSHEET_TEXT_CONTENT_TYPES, SPREADSHEET_TEXT_RELATIONSHIP_TYPES)
+    # Workbook part only leads to the text-bearing ones, styles are never touched
+    assert sorted(parts) == ["xl/comments1.xml", "xl/sharedStrings.xml", "xl/worksheets/sheet1.xml"]
+    rewriter = TextNodeRewriter("t")
+    assert sorted(extract_texts(archive, parts, rewriter)) == ["2024", "Kot", "Pies", "Uwaga"]
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as target:
+        rewrite_parts(archive, target, parts, rewriter, {"Kot": "Cat", "Pies": "Dog", "Uwaga": "Note"})
+    with zipfile.ZipFile(buffer) as target:
+        assert target.read("xl/sharedStrings.xml") == b'<sst><si><t>Cat</t></si><si><t>2024</t></si></sst>'
+        # Formulas and values of the worksheet survive, only inline strings are replaced
+        sheet = target.read("xl/worksheets/sheet1.xml").decode("UTF-8")
+        assert '<is><t>Dog</t></is>' in sheet and '<f>SUM(1,2)</f><v>3</v>' in sheet
+        assert b'<rPr><b/></rPr><t>Note</t>' in target.read("xl/comments1.xml")
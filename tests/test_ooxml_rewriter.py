@@ -0,0 +1,49 @@
+# Import builtin libs
+import io
+# Import third-party libs
+import pytest
+# Import custom libs
+from ooxml_rewriter import TextNodeRewriter
+
+PART = ('<?xml version="1.0" encoding="UTF-8"?><w:document><w:body>'
+        '<w:p><w:r><w:t>Ala ma kota</w:t></w:r><w:r><w:t xml:space="preserve"> i psa </w:t></w:r></w:p>'
+        '<w:p><w:r><w:t/></w:r><w:r><w:tab/><w:t>Tom &amp; Jerry</w:t></w:r></w:p>'
+        '<w:p><w:r><w:t>Ala</w:t></w:r><w:r><w:t>Zażółć gęślą jaźń</w:t></w:r></w:p>'
+        '</w:body></w:document>')
+TEXTS = ["Ala ma kota", " i psa ", "Tom & Jerry", "Ala", "Zażółć gęślą jaźń"]
+
+
+# Tiny chunks cut text elements, tags and multibyte characters at every possible place
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 1 << 16])
+def test_iter_texts(chunk_size):
+    rewriter = TextNodeRewriter("w:t", chunk_size=chunk_size)
+    assert list(rewriter.iter_texts(io.BytesIO(PART.encode("UTF-8")))) == TEXTS
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1 << 16])
+def test_rewrite(chunk_size):
+    rewriter = TextNodeRewriter("w:t", chunk_size=chunk_size)
+    target = io.BytesIO()
+    # Text being prefix of another one is replaced only in its own element
+    translation = {"Ala": "Alice", "Ala ma kota": "Alice has a cat", "Tom & Jerry": "Tom <3 Jerry"}
+    replaced = rewriter.rewrite(io.BytesIO(PART.encode("UTF-8")), target, translation)
+    assert replaced == 3
+    expected = (PART.replace("<w:t>Ala ma kota<", "<w:t>Alice has a cat<")
+                .replace("<w:t>Ala<", "<w:t>Alice<")
+                .replace("Tom &amp; Jerry", "Tom &lt;3 Jerry"))
+    assert target.getvalue().decode("UTF-8") == expected
+
+
+def test_rewrite_without_translation_copies_part():
+    rewriter = TextNodeRewriter("a:t", chunk_size=5)
+    part = '<a:p><a:r><a:rPr lang="pl-PL"/><a:t>Slajd</a:t></a:r></a:p>'.encode("UTF-8")
+    target = io.BytesIO()
+    assert rewriter.rewrite(io.BytesIO(part), target, {}) == 0
+    assert target.getvalue() == part
+
+
+def test_excel_tag_doesnt_match_other_elements():
+    rewriter = TextNodeRewriter("t")
+    part = b'<sst><si><t>Sheet text</t></si><si><r><rPr><b/></rPr><t xml:space="preserve">Bold </t></r></si>' \
+           b'<tableStyles><tx>not text</tx></tableStyles></sst>'
+    assert list(rewriter.iter_texts(io.BytesIO(part))) == ["Sheet text", "Bold "]
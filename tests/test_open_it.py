@@ -0,0 +1,52 @@
+# Import builtin libs
+import zipfile
+# Import third-party libs
+import pytest
+# Import custom libs
+from open_it import TranslateDocument, TranslateWorkbook
+from metrics import get_metrics, metric_key
+
+DOCUMENT = '<w:document><w:body><w:p><w:r><w:t>Ala ma kota</w:t></w:r></w:p></w:body></w:document>'
+SHARED_STRINGS = '<sst><si><t>Ala ma kota</t></si><si><t>Pies</t></si></sst>'
+
+
+@pytest.fixture(autouse=True)
+def mock_engine(monkeypatch, tmp_path):
+    # Translation memory is created in the working folder
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TRANSLATION_ENGINE", "mock")
+    monkeypatch.setenv("MOCK_ENGINE_LATENCY", "0")
+
+
+def make_package(path, part, xml):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", "<Types/>")
+        archive.writestr(part, xml)
+        archive.writestr("media/image1.png", bytes(range(256)) * 8, zipfile.ZIP_STORED)
+
+
+@pytest.mark.parametrize("translator, file_name, part, xml", [
+    (TranslateDocument, "document.docx", "word/document.xml", DOCUMENT),
+    (TranslateWorkbook, "workbook.xlsx", "xl/sharedStrings.xml", SHARED_STRINGS),
+])
+def test_translated_copy_is_written_next_to_untouched_source(tmp_path, translator, file_name, part, xml):
+    source = tmp_path / file_name
+    make_package(source, part, xml)
+    source_bytes = source.read_bytes()
+    metrics = get_metrics()
+    metrics.drain()
+    translator(file_to_translate=str(source)).main()
+    # Texts of the part are packed into a single batch, like the ones translated by the server
+    assert metrics.drain().get(metric_key("translation_api_calls_total", engine="mock")) == 1
+
+    # Source keeps its name and contents, the copy gets the same extension
+    assert source.read_bytes() == source_bytes
+    target = tmp_path / file_name.replace(".", "_translated_copy.")
+    with zipfile.ZipFile(target) as archive, zipfile.ZipFile(source) as original:
+        assert archive.testzip() is None
+        assert archive.read(part).decode("UTF-8") == xml.replace("Ala ma kota", "ALA MA KOTA").replace("Pies", "PIES")
+        # Other members are copied as they are, compressed the same way
+        for info in original.infolist():
+            if info.filename != part:
+                assert archive.getinfo(info.filename).compress_type == info.compress_type
+                assert archive.read(info.filename) == original.read(info.filename)
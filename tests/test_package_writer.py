@@ -0,0 +1,95 @@
+# Import builtin libs
+import io
+import zipfile
+# Import third-party libs
+import pytest
+# Import custom libs
+from package_writer import PackageWriter, LOCAL_HEADER_STRUCT
+
+MEMBERS = {
+    "[Content_Types].xml": b"<Types/>" * 50,
+    "word/document.xml": "<w:t>Zażółć gęślą jaźń</w:t>".encode("UTF-8") * 200,
+    "word/media/image1.png": bytes(range(256)) * 40,
+}
+
+
+def copy_package(source_bytes, exclude=()):
+    target = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(source_bytes)) as archive_source, PackageWriter(target) as writer:
+        writer.copy_unchanged(archive_source, exclude)
+    return target.getvalue()
+
+
+def assert_round_trip(source_bytes, exclude=()):
+    copied = copy_package(source_bytes, exclude)
+    with zipfile.ZipFile(io.BytesIO(source_bytes)) as source, zipfile.ZipFile(io.BytesIO(copied)) as target:
+        # testzip reads every member and checks its CRC, None means all of them are intact
+        assert target.testzip() is None
+        expected = [info for info in source.infolist() if info.filename not in exclude]
+        assert [info.filename for info in target.infolist()] == [info.filename for info in expected]
+        for info in expected:
+            copied_info = target.getinfo(info.filename)
+            assert copied_info.compress_type == info.compress_type
+            assert copied_info.compress_size == info.compress_size
+            assert target.read(info.filename) == source.read(info.filename)
+    return copied
+
+
+@pytest.mark.parametrize("compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_copy_round_trip(compression):
+    source = io.BytesIO()
+    with zipfile.ZipFile(source, "w", compression) as archive:
+        for name, data in MEMBERS.items():
+            archive.writestr(name, data)
+    assert_round_trip(source.getvalue())
+
+
+def test_copy_mixed_compression_and_exclude():
+    source = io.BytesIO()
+    with zipfile.ZipFile(source, "w") as archive:
+        archive.writestr("[Content_Types].xml", MEMBERS["[Content_Types].xml"], zipfile.ZIP_DEFLATED)
+        archive.writestr("word/media/image1.png", MEMBERS["word/media/image1.png"], zipfile.ZIP_STORED)
+        archive.writestr("word/document.xml", MEMBERS["word/document.xml"], zipfile.ZIP_DEFLATED)
+    assert_round_trip(source.getvalue(), exclude={"word/document.xml"})
+
+
+def test_copy_members_with_data_descriptor():
+    # Members written to unseekable stream have sizes in data descriptors, the copy has them in the header
+    class Unseekable(io.BytesIO):
+        def seekable(self):
+            return False
+
+    source = Unseekable()
+    with zipfile.ZipFile(source, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in MEMBERS.items():
+            with archive.open(name, "w") as member:
+                member.write(data)
+    copied = assert_round_trip(source.getvalue())
+    with zipfile.ZipFile(io.BytesIO(copied)) as target:
+        assert not any(info.flag_bits & 0x08 for info in target.infolist())
+
+
+def test_copy_members_with_zip64_local_header():
+    # Local headers with zip64 extra field are longer, member data must still be found behind them
+    source = io.BytesIO()
+    with zipfile.ZipFile(source, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in MEMBERS.items():
+            with archive.open(name, "w", force_zip64=True) as member:
+                member.write(data)
+    assert_round_trip(source.getvalue())
+
+
+def test_copy_zip64_members(monkeypatch):
+    # Members bigger than the zip64 limit are emulated by lowering the limit instead of writing gigabytes
+    monkeypatch.setattr(zipfile, "ZIP64_LIMIT", 1000)
+    source = io.BytesIO()
+    with zipfile.ZipFile(source, "w", zipfile.ZIP_STORED) as archive:
+        for name, data in MEMBERS.items():
+            archive.writestr(name, data)
+    copied = assert_round_trip(source.getvalue())
+    with zipfile.ZipFile(io.BytesIO(copied)) as target:
+        info = target.getinfo("word/media/image1.png")
+    # Sizes of big members are kept in the zip64 extra field, local header has only the placeholders
+    header = LOCAL_HEADER_STRUCT.unpack_from(copied, info.header_offset)
+    assert header[8:10] == (0xFFFFFFFF, 0xFFFFFFFF)
+    assert header[11] > 0
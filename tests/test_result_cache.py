@@ -0,0 +1,60 @@
+# Import third-party libs
+import pytest
+# Import custom libs
+import result_cache
+from result_cache import ResultCache, files_digest, reuse_result
+from storage import FileSystemStorage, BLOB_PREFIX
+from metrics import get_metrics
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path / "results.sqlite3"), max_entries=2, max_bytes=100)
+    storage = FileSystemStorage(str(tmp_path / "storage"))
+    monkeypatch.setattr(result_cache, "get_result_cache", lambda: cache)
+    monkeypatch.setattr(result_cache, "get_storage", lambda: storage)
+    cache.storage = storage
+    return cache
+
+
+def test_files_digest_depends_on_names_and_contents():
+    assert files_digest({"a.docx": "00", "b.docx": "11"}) == files_digest({"b.docx": "11", "a.docx": "00"})
+    assert files_digest({"a.docx": "00"}) != files_digest({"b.docx": "00"})
+    assert files_digest({"a.docx": "00"}) != files_digest({"a.docx": "11"})
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    cache.put("first", BLOB_PREFIX + "1", 10)
+    cache.put("second", BLOB_PREFIX + "2", 10)
+    assert cache.get("first") == BLOB_PREFIX + "1"
+    cache.put("third", BLOB_PREFIX + "3", 10)
+    assert cache.get("second") is None
+    # Size limit is kept as well, entries are evicted until both limits are met
+    cache.put("big", BLOB_PREFIX + "4", 90)
+    assert cache.get("first") is None
+    cache.put("huge", BLOB_PREFIX + "5", 95)
+    assert cache.get("third") is None and cache.get("big") is None
+    assert cache.get("huge") == BLOB_PREFIX + "5"
+
+
+def test_reuse_result_links_cached_blob_and_counts_once(cache):
+    blob_key = BLOB_PREFIX + "archive.zip"
+    cache.storage.put_bytes(b"archive", blob_key)
+    cache.put("key", blob_key, 7)
+    metrics = get_metrics()
+    metrics.drain()
+
+    assert reuse_result("key", "user/job/result.zip") == blob_key
+    assert cache.storage.resolve("user/job/result.zip") == blob_key
+    assert reuse_result("missing", "user/other/result.zip") is None
+    # Worker looks the result up again without counting the job twice
+    assert reuse_result("missing", "user/other/result.zip", count=False) is None
+    counters = metrics.drain()
+    assert counters.get("translation_result_cache_hits_total") == 1
+    assert counters.get("translation_result_cache_misses_total") == 1
+
+
+def test_swept_blob_is_forgotten(cache):
+    cache.put("key", BLOB_PREFIX + "swept.zip", 7)
+    assert reuse_result("key", "user/job/result.zip") is None
+    assert cache.get("key") is None
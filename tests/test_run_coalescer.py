@@ -0,0 +1,85 @@
+# Import builtin libs
+import io
+# Import third-party libs
+import pytest
+# Import custom libs
+from run_coalescer import RunCoalescer
+from ooxml_rewriter import TextNodeRewriter
+from metrics import get_metrics
+
+WORD_PART = ('<w:body><w:p>'
+             '<w:r w:rsidR="00A1"><w:rPr><w:b/></w:rPr><w:t>Hel</w:t></w:r><w:proofErr w:type="spellStart"/>'
+             '<w:r w:rsidRPr="00B2"><w:rPr><w:b/></w:rPr><w:t xml:space="preserve">lo </w:t></w:r>'
+             '<w:r><w:t>world</w:t></w:r>'
+             '</w:p><w:p><w:r><w:t>Second</w:t></w:r><w:r><w:lastRenderedPageBreak/><w:t> one</w:t></w:r></w:p>'
+             '</w:body>')
+SLIDE_PART = ('<p:txBody><a:p>'
+              '<a:r><a:rPr lang="pl-PL" dirty="0"/><a:t>Dzień </a:t></a:r>'
+              '<a:r><a:rPr lang="pl-PL" dirty="0" err="1"/><a:t>dobry</a:t></a:r>'
+              '<a:r><a:rPr lang="pl-PL" b="1"/><a:t>!</a:t></a:r>'
+              '</a:p></p:txBody>')
+
+
+def extract(prefix, part, chunk_size=1 << 16):
+    rewriter = TextNodeRewriter("{}:t".format(prefix), chunk_size=chunk_size,
+                                coalescer=RunCoalescer(prefix, chunk_size=chunk_size))
+    return list(rewriter.iter_texts(io.BytesIO(part.encode("UTF-8"))))
+
+
+def test_word_runs_are_merged_within_paragraphs():
+    # Runs with the same properties become one, formatting differences are kept
+    normalized = RunCoalescer("w").normalize(WORD_PART)
+    assert normalized.count("<w:r>") == 3
+    # Texts of runs of the same paragraph are translated as one segment, paragraphs are kept apart
+    assert extract("w", WORD_PART) == ["Hello world", "Second one"]
+
+
+def test_powerpoint_noise_is_removed_only_from_run_properties():
+    assert extract("a", SLIDE_PART) == ["Dzień dobry!"]
+    normalized = RunCoalescer("a").normalize('<a:tbl dirty="1"/>' + SLIDE_PART)
+    assert '<a:tbl dirty="1"/>' in normalized
+    assert 'dirty="0"' not in normalized
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 64])
+def test_streaming_matches_whole_part(chunk_size):
+    coalescer = RunCoalescer("w", chunk_size=chunk_size)
+    whole = coalescer.normalize(WORD_PART)
+    with coalescer.wrap(io.BytesIO(WORD_PART.encode("UTF-8"))) as stream:
+        streamed = b"".join(iter(lambda: stream.read(3), b""))
+    assert streamed.decode("UTF-8") == whole
+    assert extract("w", WORD_PART, chunk_size) == ["Hello world", "Second one"]
+
+
+def test_merged_runs_counted_only_on_extraction():
+    rewriter = TextNodeRewriter("w:t", coalescer=RunCoalescer("w"))
+    metrics = get_metrics()
+    metrics.drain()
+    list(rewriter.iter_texts(io.BytesIO(WORD_PART.encode("UTF-8"))))
+    rewriter.rewrite(io.BytesIO(WORD_PART.encode("UTF-8")), io.BytesIO(), {"Hello world": "Witaj świecie"})
+    assert metrics.drain().get("translation_runs_merged_total") == 2
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1 << 16])
+def test_paragraph_translation_is_distributed_over_runs(chunk_size):
+    rewriter = TextNodeRewriter("w:t", chunk_size=chunk_size, coalescer=RunCoalescer("w", chunk_size=chunk_size))
+    target = io.BytesIO()
+    translation = {"Hello world": "Witaj piękny świecie", "Second one": "Drugi"}
+    assert rewriter.rewrite(io.BytesIO(WORD_PART.encode("UTF-8")), target, translation) == 3
+    # Bold run keeps the beginning of the sentence, the split space is preserved by Word
+    assert extract("w", target.getvalue().decode("UTF-8")) == ["Witaj piękny świecie", "Drugi"]
+    rewritten = target.getvalue().decode("UTF-8")
+    assert '<w:rPr><w:b/></w:rPr><w:t xml:space="preserve">Witaj piękny </w:t></w:r>' in rewritten
+
+
+def test_runs_separated_by_other_markup_are_separate_segments():
+    part = ('<w:p><w:r><w:rPr><w:b/></w:rPr><w:t>Name</w:t></w:r><w:r><w:tab/><w:t>Value</w:t></w:r>'
+            '<w:r><w:t>A</w:t></w:r></w:p><w:p><w:r><w:rPr><w:i/></w:rPr><w:t>B</w:t></w:r></w:p>')
+    assert extract("w", part) == ["Name", "ValueA", "B"]
+
+
+def test_distribute_cuts_at_whitespace_in_proportion():
+    assert TextNodeRewriter.distribute("one two three four", ["ab", "cd"]) == ["one two ", "three four"]
+    # Text without whitespace is cut at the proportional position
+    assert TextNodeRewriter.distribute("abcdef", ["x", "yy"]) == ["ab", "cdef"]
+    assert "".join(TextNodeRewriter.distribute("a b", ["x", "y", "z", "w"])) == "a b"
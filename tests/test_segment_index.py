@@ -0,0 +1,24 @@
+# Import custom libs
+from segment_index import SegmentIndex
+
+
+def test_segments_differing_in_whitespace_are_indexed_once():
+    index = SegmentIndex()
+    index.add(["Ala ma kota", "  Ala  ma\nkota ", None, "   "])
+    index.add(["Ala ma kota", "Pies"])
+    assert list(index.segments) == ["Ala ma kota", "Pies"]
+    assert len(index) == 2
+
+
+def test_lookup_keeps_edge_whitespace_and_skips_untouched_segments():
+    index = SegmentIndex()
+    segments = [" Ala  ma kota ", "Pies", "2024", None]
+    index.add(segments)
+    translation = {"Ala ma kota": "Alice has a cat", "Pies": None, "2024": "2024"}
+    assert index.lookup(segments, translation) == {" Ala  ma kota ": " Alice has a cat "}
+
+
+def test_intersects_compares_normalized_segments():
+    index = SegmentIndex()
+    assert index.intersects(["Ala\tma  kota", None], {"Ala ma kota"})
+    assert not index.intersects(["Pies", None], {"Ala ma kota"})
@@ -0,0 +1,41 @@
+# Import builtin libs
+from types import SimpleNamespace
+# Import third-party libs
+import pytest
+# Import custom libs
+import segment_translation
+from async_client import AsyncTranslationClient
+from engines import EngineError, FailoverEngine, GlossaryEngine, TranslationEngine
+from metrics import get_metrics
+from segment_translation import SegmentTranslation
+from translation_memory import TranslationMemory
+
+
+class ThrottledEngine(TranslationEngine):
+    name = "throttled"
+
+    def translate_text(self, text, input_l, output_l):
+        raise EngineError("Rate exceeded", code="ThrottlingException")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = AsyncTranslationClient(max_concurrency=2, max_retries=1)
+    monkeypatch.setattr(segment_translation, "get_translation_client", lambda: client)
+    yield client
+    client.close()
+
+
+def test_failover_translation_is_degraded_and_not_remembered(tmp_path, client):
+    translation_memory = TranslationMemory(str(tmp_path / "tm.sqlite3"))
+    engine = FailoverEngine([ThrottledEngine(), GlossaryEngine({"pl-en": {"kot": "cat"}})])
+    context = SimpleNamespace(engine=engine, translation_memory=translation_memory, input_l="pl", output_l="en")
+    metrics = get_metrics()
+    metrics.drain()
+
+    translation = SegmentTranslation(context)
+    assert translation.translate(["kot"]) == {"kot": "cat"}
+    assert translation.degraded == {"kot"}
+    assert not translation.cacheable
+    assert translation_memory.get_many(["kot"], "pl", "en") == {}
+    assert metrics.drain().get("translation_degraded_segments_total") == 1
@@ -0,0 +1,81 @@
+# Import builtin libs
+import os
+import time
+# Import third-party libs
+import pytest
+# Import custom libs
+from storage import FileSystemStorage, BLOB_PREFIX
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return FileSystemStorage(str(tmp_path / "storage"))
+
+
+def make_old(storage, key, age):
+    past = time.time() - age
+    os.utime(storage.path(key), (past, past))
+
+
+@pytest.mark.parametrize("moment", ["before listing", "after listing", "before removal"])
+def test_sweep_keeps_blob_linked_during_sweep(storage, moment):
+    storage.put_bytes(b"archive", BLOB_PREFIX + "old.zip")
+    make_old(storage, BLOB_PREFIX + "old.zip", 100)
+    list_objects = storage.list_objects
+    delete_stale = storage.delete_stale
+
+    def link():
+        storage.link(BLOB_PREFIX + "old.zip", "user/job/result.zip")
+
+    # Result is linked to the old blob after the sweeper read the results, e.g. reused from the result cache
+    def list_objects_linking(prefix=""):
+        if prefix != BLOB_PREFIX:
+            return list_objects(prefix)
+        if moment == "before listing":
+            link()
+        objects = list(list_objects(prefix))
+        if moment == "after listing":
+            link()
+        return objects
+
+    def delete_stale_linking(key, before):
+        if moment == "before removal":
+            link()
+        return delete_stale(key, before)
+
+    storage.list_objects = list_objects_linking
+    storage.delete_stale = delete_stale_linking
+    assert storage.sweep(ttl=1000, grace=10) == (0, 0)
+    assert storage.get_bytes(storage.resolve("user/job/result.zip")) == b"archive"
+
+
+def test_store_result_uploads_swept_blob_again(storage, tmp_path):
+    archive = tmp_path / "translated_files.zip"
+    archive.write_bytes(b"archive")
+    blob_key = storage.store_result(str(archive), "user/first/translated_files.zip")
+    make_old(storage, blob_key, 100)
+    storage.delete("user/first/translated_files.zip")
+    assert storage.sweep(ttl=1000, grace=10) == (0, 1)
+    assert storage.store_result(str(archive), "user/second/translated_files.zip") == blob_key
+    assert storage.get_bytes(storage.resolve("user/second/translated_files.zip")) == b"archive"
+
+
+def test_sweep_removes_expired_results_and_unused_blobs(storage):
+    storage.put_bytes(b"archive", BLOB_PREFIX + "used.zip")
+    storage.put_bytes(b"archive", BLOB_PREFIX + "unused.zip")
+    storage.put_bytes(b"archive", BLOB_PREFIX + "fresh.zip")
+    storage.link(BLOB_PREFIX + "used.zip", "user/job/result.zip")
+    storage.link(BLOB_PREFIX + "unused.zip", "user/old/result.zip")
+    make_old(storage, "user/old/result.zip", 2000)
+    for name in ("used.zip", "unused.zip"):
+        make_old(storage, BLOB_PREFIX + name, 100)
+    assert storage.sweep(ttl=1000, grace=10) == (1, 1)
+    assert storage.exists(BLOB_PREFIX + "used.zip")
+    assert storage.exists(BLOB_PREFIX + "fresh.zip")
+    assert not storage.exists(BLOB_PREFIX + "unused.zip")
+
+
+def test_link_to_swept_blob_fails(storage):
+    with pytest.raises(FileNotFoundError):
+        storage.link(BLOB_PREFIX + "missing.zip", "user/job/result.zip")
+    assert not storage.exists("user/job/result.zip")
@@ -0,0 +1,55 @@
+# Import third-party libs
+import pytest
+# Import custom libs
+import translation_memory
+from translation_memory import TranslationMemory
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(translation_memory, "time", clock)
+    return clock
+
+
+def test_translations_are_shared_through_the_database(tmp_path, clock):
+    db_path = str(tmp_path / "tm.sqlite3")
+    TranslationMemory(db_path).put_many({"kot": "cat", "pies": "dog"}, "pl", "en")
+    # Other worker with empty memory tier reads them from disk, other language pairs are kept apart
+    other = TranslationMemory(db_path)
+    assert other.get_many(["kot", "pies", "mysz"], "pl", "en") == {"kot": "cat", "pies": "dog"}
+    assert other.get("kot", "pl", "de") is None
+
+
+def test_expired_translations_are_missing_in_both_tiers(tmp_path, clock):
+    memory = TranslationMemory(str(tmp_path / "tm.sqlite3"), ttl=100)
+    memory.put("kot", "pl", "en", "cat")
+    clock.now += 99
+    assert memory.get("kot", "pl", "en") == "cat"
+    clock.now += 2
+    assert memory.get("kot", "pl", "en") is None
+    memory.lru.clear()
+    assert memory.get("kot", "pl", "en") is None
+    memory.evict()
+    assert memory.connection().execute("SELECT COUNT(*) FROM translations").fetchone()[0] == 0
+
+
+def test_least_recently_accessed_translations_are_evicted(tmp_path, clock):
+    memory = TranslationMemory(str(tmp_path / "tm.sqlite3"), lru_size=1, max_entries=2)
+    for text in ("kot", "pies", "mysz"):
+        memory.put(text, "pl", "en", text.upper())
+        clock.now += 1
+    # Reading from disk refreshes the entry, so the oldest unread one goes first
+    memory.lru.clear()
+    assert memory.get("kot", "pl", "en") == "KOT"
+    memory.evict()
+    memory.lru.clear()
+    assert memory.get_many(["kot", "pies", "mysz"], "pl", "en") == {"kot": "KOT", "mysz": "MYSZ"}
@@ -0,0 +1,45 @@
+# Import builtin libs
+import io
+# Import third-party libs
+import pytest
+
+pptx = pytest.importorskip("pptx")
+# Import custom libs
+from translators import PresentationTranslator
+
+
+def make_paragraph():
+    presentation = pptx.Presentation()
+    slide = presentation.slides.add_slide(presentation.slide_layouts[6])
+    text_frame = slide.shapes.add_textbox(0, 0, 100, 100).text_frame
+    paragraph = text_frame.paragraphs[0]
+    # Two lines separated with <a:br/>, the first run is bold
+    paragraph.text = "Pierwsza linia\vdruga linia"
+    paragraph.runs[0].font.bold = True
+    paragraph.runs[1].font.italic = True
+    return presentation, paragraph
+
+
+def test_line_breaks_are_rebuilt_from_translation():
+    presentation, paragraph = make_paragraph()
+    PresentationTranslator.replace_paragraph_text_retaining_initial_formatting(paragraph, "First line\vsecond line")
+    assert paragraph.text == "First line\vsecond line"
+    xml = paragraph._p.xml
+    assert "_x000B_" not in xml
+    assert len(paragraph._p.xpath("./a:br")) == 1
+    # Break stays between the lines
+    assert [element.tag.split("}")[1] for element in paragraph._p.xpath("./a:r | ./a:br")] == ["r", "br", "r"]
+    assert all(run.font.bold for run in paragraph.runs)
+    # Saved presentation is read back with the same text
+    saved = io.BytesIO()
+    presentation.save(saved)
+    shape = pptx.Presentation(saved).slides[0].shapes[0]
+    assert shape.text_frame.paragraphs[0].text == "First line\vsecond line"
+
+
+def test_translation_without_breaks_makes_single_run():
+    presentation, paragraph = make_paragraph()
+    PresentationTranslator.replace_paragraph_text_retaining_initial_formatting(paragraph, "One line")
+    assert paragraph.text == "One line"
+    assert not paragraph._p.xpath("./a:br")
+    assert len(paragraph.runs) == 1 and paragraph.runs[0].font.bold
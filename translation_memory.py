@@ -0,0 +1,130 @@
+# Import builtin libs
+import threading
+import time
+from collections import OrderedDict
+from hashlib import sha256
+# Import custom libs
+from utils import *
+from sqlite_store import SQLiteStore, get_store
+
+
+class TranslationMemory(SQLiteStore):
+    """
+    Two-tier cache of already translated segments, keyed on (source text, input_l, output_l).
+    The first tier is an in-process LRU dictionary, the second one is SQLite database on disk,
+    so every server worker shares translations made by the other ones.
+    """
+    def __init__(self, db_path: str = TRANSLATION_MEMORY_DB, lru_size: int = TRANSLATION_MEMORY_LRU_SIZE,
+                 max_entries: int = TRANSLATION_MEMORY_MAX_ENTRIES, ttl: int = TRANSLATION_MEMORY_TTL):
+        super().__init__(db_path)
+        self.lru_size = lru_size
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # In-process tier, the most recently used entries are kept at the end
+        self.lru = OrderedDict()
+        self.lock = threading.Lock()
+        self.puts_since_eviction = 0
+        self.prepare_database()
+
+    @staticmethod
+    def make_key(text, input_l, output_l):
+        return sha256("\x00".join((input_l, output_l, text)).encode("UTF-8")).hexdigest()
+
+    def prepare_database(self):
+        conn = self.connection()
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS translations ("
+                         "key TEXT PRIMARY KEY, input_l TEXT, output_l TEXT, source TEXT, translation TEXT, "
+                         "created REAL, accessed REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS translations_accessed ON translations (accessed)")
+            conn.execute("CREATE INDEX IF NOT EXISTS translations_created ON translations (created)")
+
+    def remember_locally(self, key, translation, created):
+        # Must be called with the lock acquired
+        self.lru[key] = (translation, created)
+        self.lru.move_to_end(key)
+        while len(self.lru) > self.lru_size:
+            self.lru.popitem(last=False)
+
+    def get(self, text, input_l, output_l):
+        """
+        Returns translation of the text or None if it isn't stored in any of the tiers
+        """
+        return self.get_many([text], input_l, output_l).get(text)
+
+    def get_many(self, texts, input_l, output_l):
+        """
+        Looks up many segments at once, returns dictionary containing only found translations
+        """
+        now = time.time()
+        found = {}
+        missing = {}
+        with self.lock:
+            for text in texts:
+                key = self.make_key(text, input_l, output_l)
+                entry = self.lru.get(key)
+                if entry is not None and now - entry[1] < self.ttl:
+                    self.lru.move_to_end(key)
+                    found[text] = entry[0]
+                else:
+                    missing[key] = text
+        if not missing:
+            return found
+
+        # Segments not present in the memory tier are looked up on disk, expired ones are treated as missing
+        conn = self.connection()
+        keys = list(missing)
+        rows = []
+        # SQLite limits number of variables in a single statement
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows += conn.execute("SELECT key, translation, created FROM translations WHERE key IN ({}) AND created > ?"
+                                 .format(",".join("?" * len(chunk))), chunk + [now - self.ttl]).fetchall()
+        if rows:
+            with conn:
+                conn.executemany("UPDATE translations SET accessed = ? WHERE key = ?", [(now, row[0]) for row in rows])
+        with self.lock:
+            for key, translation, created in rows:
+                found[missing[key]] = translation
+                self.remember_locally(key, translation, created)
+        return found
+
+    def put(self, text, input_l, output_l, translation):
+        self.put_many({text: translation}, input_l, output_l)
+
+    def put_many(self, translations, input_l, output_l):
+        """
+        Stores dictionary of source texts and their translations in both tiers
+        """
+        if not translations:
+            return
+        now = time.time()
+        rows = []
+        with self.lock:
+            for text, translation in translations.items():
+                key = self.make_key(text, input_l, output_l)
+                self.remember_locally(key, translation, now)
+                rows.append((key, input_l, output_l, text, translation, now, now))
+            self.puts_since_eviction += len(rows)
+            evict = self.puts_since_eviction >= TRANSLATION_MEMORY_EVICTION_INTERVAL
+            if evict:
+                self.puts_since_eviction = 0
+        conn = self.connection()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """
+        Removes expired entries and trims the database to the configured size, least recently used go first
+        """
+        conn = self.connection()
+        with conn:
+            conn.execute("DELETE FROM translations WHERE created <= ?", (time.time() - self.ttl,))
+            conn.execute("DELETE FROM translations WHERE key IN (SELECT key FROM translations "
+                         "ORDER BY accessed DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+
+def get_translation_memory(db_path: str = TRANSLATION_MEMORY_DB):
+    return get_store(TranslationMemory, db_path)
@@ -1,125 +1,115 @@
 # Import builtin libs
+import json
+import logging
 import os
+from copy import deepcopy
 from os import path
 from glob import glob
-from shutil import copyfile
-from threading import Thread
-from queue import Queue
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from itertools import repeat
 from abc import ABC, abstractmethod
 # Import third-party libs
 import zipfile
-from bs4 import BeautifulSoup as bs
 from pptx import Presentation
-import pandas as pd
-import boto3
+from pptx.shapes.group import GroupShape
 # Import custom libs
-from shared_variables import AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY
 from utils import *
+from context import TranslationContext
+from async_client import configure_translating_process
+from segment_translation import SegmentTranslation
+from ooxml_rewriter import TextNodeRewriter
+from run_coalescer import RunCoalescer
+from ooxml_package import discover_text_parts, extract_texts, rewrite_parts, WORD_TEXT_CONTENT_TYPES, \
+    WORD_TEXT_RELATIONSHIP_TYPES, SPREADSHEET_TEXT_CONTENT_TYPES, SPREADSHEET_TEXT_RELATIONSHIP_TYPES
+from segment_index import SegmentIndex
+from package_writer import PackageWriter
+from metrics import get_metrics, run_measured, summarize
+
+logger = logging.getLogger(__name__)
 
 
 class Translator(ABC):
-    input_l = "pl"
-    output_l = "en"
+    @abstractmethod
+    def extract_segments(self):
+        """
+        Returns list of segments of the file which should be translated
+        """
+        pass
 
     @abstractmethod
-    def process_specific_file(self):
+    def apply_translation(self, translation):
+        """
+        Writes translated copy of the file using dictionary of segments and their translations
+        """
         pass
 
-    def __init__(self, file_to_translate: str = None, prepare_target_files: bool = True):
+    def process_specific_file(self):
+        self.apply_translation(self.translate_segments(self.extract_segments()))
+
+    def __init__(self, file_to_translate: str = None, context: TranslationContext = None,
+                 prepare_target_files: bool = True):
         # Naming stuff
-        self.old_extension = None
         self.file_to_translate = file_to_translate
-        self.file_to_translate_zipped = ""
+        # Settings of the job are kept per instance, so concurrent jobs never see each other's language pair
+        # Each job may use its own folders, so concurrent jobs don't overwrite each other's files
+        self.context = context or TranslationContext()
+        self.source_folder = self.context.source_folder
+        self.target_folder = self.context.target_folder
         # Archive files
         self.archive_source = None
         self.archive_target = None
-        # Methods required on start-up
-        self.translate_service = None
-        self.connect_to_translate_service()
+        self.package_writer = None
+        # Segments are translated with the engine, translation memory and client shared by the process
+        self.segment_translation = SegmentTranslation(self.context)
         if prepare_target_files:
-            self.convert_file_ext()
             self.open_zips()
 
-    @classmethod
-    def change_input_language(cls, new_input_l):
-        cls.input_l = new_input_l
-
-    @classmethod
-    def change_ouput_language(cls, new_output_l):
-        cls.output_l = new_output_l
+    @property
+    def input_l(self):
+        return self.context.input_l
 
-    def connect_to_translate_service(self):
-        self.translate_service = boto3.client(service_name='translate', region_name='us-east-1', use_ssl=True,
-                                              aws_access_key_id=AWS_ACCESS_KEY_ID,
-                                              aws_secret_access_key=AWS_SECRET_ACCESS_KEY
-                                              )
+    @property
+    def output_l(self):
+        return self.context.output_l
 
     def open_zips(self):
-        # Source archive should be opened just in read mode, no modifications are applied on i
-        self.archive_source = zipfile.ZipFile(path.join(SOURCE_FOLDER, self.file_to_translate_zipped), "r")
-
-        # Target archive is starting as complete copy of source archive, opened in write mode,
-        # it's located in the target folder and thus can have the same name
-        copyfile(path.join(SOURCE_FOLDER, self.file_to_translate_zipped),
-                 path.join(TARGET_FOLDER, self.file_to_translate_zipped))
-        self.archive_target = zipfile.ZipFile(path.join(TARGET_FOLDER, self.file_to_translate_zipped), "w")
-
-    def request_translation(self, text_input):
-        # Requests are made with usage of translate client prepared with class initialization
-        result = self.translate_service.translate_text(Text=text_input,
-                                                       SourceLanguageCode=self.input_l,
-                                                       TargetLanguageCode=self.output_l)
-        return result['TranslatedText']
-
-    def convert_file_ext(self, mode="change_source"):
+        # Source archive should be opened just in read mode, no modifications are applied on it
+        # Office files are zip archives, so they don't have to be renamed to be opened
+        self.archive_source = zipfile.ZipFile(path.join(self.source_folder, self.file_to_translate), "r")
+
+    def open_target(self):
+        # Target archive is built from scratch, it's located in the target folder and thus can have the same name
+        self.package_writer = PackageWriter(path.join(self.target_folder, self.file_to_translate))
+        self.archive_target = self.package_writer.archive
+
+    def close_zips(self):
+        if self.archive_source is not None:
+            self.archive_source.close()
+        if self.package_writer is not None:
+            self.package_writer.close()
+
+    def main(self, translation: dict = None):
         """
-        Changes the extension of file to zip and backwards
-        :param mode: str["change_source", "final_change"]
+        Translates the file and returns coordinates of the translated copy
+        :param translation: translations of the file segments prepared beforehand, e.g. by SegmentIndex
         """
-        # Rename using original absolute path and that path with modified extension
-        if mode == "change_source":
-            # Old extension is returned for usage in backwards conversion
-            self.old_extension = self.file_to_translate.rsplit(".")[1]
-            self.file_to_translate_zipped = self.file_to_translate.rsplit(".")[0] + ".zip"
-            os.rename(path.join(SOURCE_FOLDER, self.file_to_translate), path.join(SOURCE_FOLDER, self.file_to_translate_zipped))
-        # Rename using original absolute path and that path with modified extension
-        elif mode == "final_change":
-            os.rename(path.join(SOURCE_FOLDER, self.file_to_translate_zipped), path.join(SOURCE_FOLDER, self.file_to_translate))
-            os.rename(path.join(TARGET_FOLDER, self.file_to_translate_zipped), path.join(TARGET_FOLDER, self.file_to_translate))
+        if translation is None:
+            self.process_specific_file()
         else:
-            raise RuntimeError("Unknown file extension change mode.")
-
-    def threaded_text_translation(self, texts_to_translate):
-        # Each worker is in fact a subscript for the list of text to translate
-        # Each thread iterates through given text in the list, sends it to API and saves translation to dictionary
-        translation = {}
-        q = Queue()
-
-        def threader():
-            while True:
-                worker = q.get()
-                translated = self.request_translation(text_input=texts_to_translate[worker])
-                translation[texts_to_translate[worker]] = translated
-                q.task_done()
+            self.apply_translation(translation)
+        return {"translated_file": self.file_to_translate,
+                "translated_file_path": path.join(self.target_folder, self.file_to_translate)}
 
-        # Ten threads are spawned
-        for i in range(10):
-            t = Thread(target=threader)
-            t.daemon = True
-            t.start()
-
-        # Each possibile index for the list of text to translate is put in the queue
-        for text_pos in range(len(texts_to_translate)):
-            q.put(text_pos)
-
-        q.join()
-
-        return translation
+    def translate_segments(self, texts_to_translate):
+        """
+        Translates list of segments with the process-wide client, returns dictionary of segments and translations
+        """
+        return self.segment_translation.translate(texts_to_translate)
 
 
 class PresentationTranslator(Translator):
-    def __init__(self, file_to_translate: str = None):
-        super().__init__(file_to_translate, False)
+    def __init__(self, file_to_translate: str = None, context: TranslationContext = None):
+        super().__init__(file_to_translate, context, False)
         self.num_of_slides = 0
         self.user_num_of_slides = None
 
@@ -127,117 +117,249 @@ class PresentationTranslator(Translator):
     def replace_paragraph_text_retaining_initial_formatting(paragraph, new_text):
         if len(paragraph.runs) == 0:
             return None
-        p = paragraph._p  # the lxml element containing the `<a:p>` paragraph element
-        # remove all but the first run
-        for idx, run in enumerate(paragraph.runs):
-            if idx == 0:
-                continue
-            p.remove(run._r)
-        paragraph.runs[0].text = new_text
+        # Formatting of the first run is applied to the whole translated paragraph
+        properties = paragraph.runs[0]._r.rPr
+        # Assigning the text removes runs, line breaks and fields, translation split on "\v" gets its own breaks
+        paragraph.text = new_text
+        if properties is not None:
+            for element in paragraph._p.xpath("./a:r | ./a:br"):
+                element.insert(0, deepcopy(properties))
 
-    def process_specific_file(self):
-        prs = Presentation(path.join(SOURCE_FOLDER, self.file_to_translate))
-        already_translated = []
+    @classmethod
+    def iter_shapes(cls, shapes):
+        # Grouped shapes are walked recursively, groups may be nested
+        for shape in shapes:
+            if isinstance(shape, GroupShape):
+                yield from cls.iter_shapes(shape.shapes)
+            else:
+                yield shape
+
+    def iter_text_frames(self, prs):
+        # Text may be placed on slides, their notes, slide masters and layouts
+        shape_collections = []
         for slide in prs.slides:
-            for shape in slide.shapes:
-                if not shape.has_text_frame:
-                    continue
-                text_frame = shape.text_frame
-                for par in text_frame.paragraphs:
-                    if len(text_frame.text) == 0 or text_frame.text in already_translated:
-                        continue
-                    translated_text = self.request_translation(text_frame.text)
-                    self.replace_paragraph_text_retaining_initial_formatting(par, translated_text)
-                    already_translated.append(text_frame.text)
-
-        prs.save(path.join(TARGET_FOLDER, self.file_to_translate))
-
-
-class DocumentTranslator(Translator):
-    def __init__(self, file_to_translate: str = None):
-        super().__init__(file_to_translate, True)
+            shape_collections.append(slide.shapes)
+            if slide.has_notes_slide:
+                shape_collections.append(slide.notes_slide.shapes)
+        for master in prs.slide_masters:
+            shape_collections.append(master.shapes)
+            for layout in master.slide_layouts:
+                shape_collections.append(layout.shapes)
+
+        for shapes in shape_collections:
+            for shape in self.iter_shapes(shapes):
+                if shape.has_text_frame:
+                    yield shape.text_frame
+                elif shape.has_table:
+                    for row in shape.table.rows:
+                        for cell in row.cells:
+                            yield cell.text_frame
+
+    def iter_paragraphs(self, prs):
+        for text_frame in self.iter_text_frames(prs):
+            for paragraph in text_frame.paragraphs:
+                if len(paragraph.runs) != 0 and len(paragraph.text.strip()) != 0:
+                    yield paragraph
+
+    def extract_segments(self):
+        """
+        First phase, collects text of every paragraph of the presentation
+        """
+        prs = Presentation(path.join(self.source_folder, self.file_to_translate))
+        return list(dict.fromkeys(paragraph.text for paragraph in self.iter_paragraphs(prs)))
 
-    def process_specific_file(self):
+    def apply_translation(self, translation):
+        """
+        Second phase, each paragraph gets its own translation written into its first run
+        """
+        prs = Presentation(path.join(self.source_folder, self.file_to_translate))
+        for paragraph in self.iter_paragraphs(prs):
+            translated_text = translation.get(paragraph.text)
+            if translated_text is not None:
+                self.replace_paragraph_text_retaining_initial_formatting(paragraph, translated_text)
+
+        prs.save(path.join(self.target_folder, self.file_to_translate))
+
+
+class PackageTranslator(Translator):
+    """
+    Translator of OOXML packages, text elements of the text-bearing parts are rewritten in place
+    """
+    text_tag = None
+    text_content_types = None
+    text_relationship_types = None
+    # Prefix of runs merged before extraction ("w" or "a"), None means the parts are read as they are
+    run_prefix = None
+
+    def __init__(self, file_to_translate: str = None, context: TranslationContext = None):
+        super().__init__(file_to_translate, context, True)
+        coalescer = RunCoalescer(self.run_prefix) if self.run_prefix else None
+        self.rewriter = TextNodeRewriter(self.text_tag, coalescer=coalescer)
+        self.text_parts = None
+
+    def find_text_parts(self):
+        if self.text_parts is None:
+            self.text_parts = discover_text_parts(self.archive_source, self.text_content_types,
+                                                  self.text_relationship_types)
+        return self.text_parts
+
+    def extract_segments(self):
         """Opens file contained in zip file without extraction"""
-        # Relative paths used to navigate within xml file
-        contents_file_location = "word/"
-        contents_file = "document.xml"
-        contents_file_rel_path = contents_file_location + contents_file
-
-        # Rewrite each file separately from the source archive to containing translation
-        for item in self.archive_source.infolist():
-            buffer = self.archive_source.read(item.filename)
-            if not item.filename.startswith("word/document"):
-                self.archive_target.writestr(item, buffer)
-
-        # Open it directly from archive and bs starts to look for text to translate
-        # After the translation the text is overwritten with translation
-        # The end of the loop is to write into archive_2
-        current_slide_data = self.archive_source.read(contents_file_rel_path)
-        xml_soup = bs(current_slide_data.decode("UTF-8"), 'lxml')
-
-        # Text is surrounded by "w:t"
-        # After finding it is converted to strings
-        texts_to_translate = xml_soup.find_all("w:t")
-        texts_to_translate = [text.string for text in texts_to_translate]
-        translation = self.threaded_text_translation(texts_to_translate)
-
-        # The source slide is unpacked into simple string
-        # Using dictionary that contains translations and sources, text will be replaced in the string
-        # After the operation, string is encoded to basic format
-        current_slide_data_decoded = current_slide_data.decode("UTF-8")
-        for item, definition in translation.items():
-            current_slide_data_decoded = current_slide_data_decoded.replace("<w:t>" + item,
-                                                                            "<w:t>" + definition)
-            current_slide_data_decoded = current_slide_data_decoded.replace('<w:t xml:space="preserve">' + item,
-                                                                            '<w:t xml:space="preserve">' + definition)
-        current_slide_data_encoded = current_slide_data_decoded.encode("UTF-8")
-
-        # To write into archive, the source file must exist
-        # The "temp" folder will contain ready to write xmls with translations
-        # After the operation the folder temp is removed
-        # Using created temp folder, create there xml file containing translation
-        # Subsequently, write (wb) that file to translation archive
-        f = open(path.join(TEMP_FOLDER, contents_file), "wb")
-        f.write(current_slide_data_encoded)
-        f.close()
-        self.archive_target.write(path.join(TEMP_FOLDER, contents_file), contents_file_rel_path)
-
-        self.archive_source.close()
-        self.archive_target.close()
-
-        self.convert_file_ext("final_change")
-
-
-class WorkbookTranslator(Translator):
-    def __init__(self, file_to_translate: str = None):
-        super().__init__(file_to_translate, False)
-        self.df = None
-
-    def process_specific_file(self):
-        xl_file_source = pd.ExcelFile(path.join(SOURCE_FOLDER, self.file_to_translate))
-        xl_file_target = pd.ExcelWriter(path.join(TARGET_FOLDER, self.file_to_translate))
-        sheet_list = xl_file_source.sheet_names
-        for sheet_name in sheet_list:
-            self.df = pd.read_excel(xl_file_source, sheet_name, header=None, dtype='object',
-                                    na_values=[], keep_default_na=False,
-                                    true_values=[], false_values=[])
-            self.process_sheet()
-            self.df.to_excel(xl_file_target, sheet_name=sheet_name, header=False, index=False)
-
-        xl_file_target.save()
-
-        return 0
-
-    def process_sheet(self):
-        # Extract text from df along with it's positions and translate
-        for col in range(len(self.df.columns)):
-            for row in range(len(self.df)):
-                extract = self.df.iloc[row, col]
-                print(extract)
-                translated_text = self.request_translation(extract)
-                print(translated_text)
-                self.df.iloc[row, col] = translated_text
+        # Parts are streamed from the archive to collect text of all of them as one deduplicated batch
+        return extract_texts(self.archive_source, self.find_text_parts(), self.rewriter)
+
+    def apply_translation(self, translation):
+        self.open_target()
+
+        # Members without text are copied to the translation as raw compressed bytes
+        self.package_writer.copy_unchanged(self.archive_source, exclude=self.find_text_parts())
+
+        # Second pass copies the parts into target archive, replacing each text element in place
+        rewrite_parts(self.archive_source, self.archive_target, self.find_text_parts(), self.rewriter, translation)
+
+        self.close_zips()
+
+
+class DocumentTranslator(PackageTranslator):
+    # Every part that may contain text (body, headers, footers, footnotes, endnotes, comments)
+    # is found with content types and relationships of the package, text is surrounded by "w:t"
+    # Runs split by spell-checking and revisions are merged first, so sentences are translated as a whole
+    text_tag = "w:t"
+    run_prefix = "w"
+    text_content_types = WORD_TEXT_CONTENT_TYPES
+    text_relationship_types = WORD_TEXT_RELATIONSHIP_TYPES
+
+
+class WorkbookTranslator(PackageTranslator):
+    # Cells refer to the shared strings table, which is already deduplicated by Excel
+    # Only the table, inline strings of worksheets and comments are rewritten, so formulas and styles survive
+    # Text is surrounded by "t", numbers and empty strings are not sent for translation
+    text_tag = "t"
+    text_content_types = SPREADSHEET_TEXT_CONTENT_TYPES
+    text_relationship_types = SPREADSHEET_TEXT_RELATIONSHIP_TYPES
+
+
+TRANSLATORS = {
+    ".docx": DocumentTranslator,
+    ".pptx": PresentationTranslator,
+    ".xlsx": WorkbookTranslator,
+}
+
+
+def extract_file_segments(file, context: TranslationContext = None):
+    """
+    Returns segments of a single file, it's a task executed by the process pool
+    """
+    with get_metrics().timer("extract"):
+        translate = TRANSLATORS[path.splitext(file)[1]](file_to_translate=file, context=context)
+        segments = translate.extract_segments()
+        translate.close_zips()
+    return segments
+
+
+def translate_file(file, context: TranslationContext = None, translation: dict = None):
+    """
+    Translates single file choosing appropriate class, it's a task executed by the process pool
+    :param translation: translations of the file segments prepared beforehand, file's own ones are requested if None
+    :return: coordinates of the translated file returned by Translator.main
+    """
+    with get_metrics().timer("apply"):
+        translate = TRANSLATORS[path.splitext(file)[1]](file_to_translate=file, context=context)
+        return translate.main(translation)
+
+
+def target_contexts(context: TranslationContext, output_languages=None):
+    """
+    Returns contexts of every target language, many targets get their own subfolders of the target folder
+    """
+    if not output_languages or list(output_languages) == [context.output_l]:
+        return [context]
+    contexts = []
+    for output_l in dict.fromkeys(output_languages):
+        target_folder = path.join(context.target_folder, output_l)
+        os.makedirs(target_folder, exist_ok=True)
+        contexts.append(context.evolve(output_l=output_l, target_folder=target_folder))
+    return contexts
+
+
+def translate_index(index, file_segments, context: TranslationContext):
+    """
+    Translates distinct segments of the index to the target language of the context.
+    In incremental mode segments unchanged since the previous versions of the files are taken from their manifests.
+    :return: tuple (dictionary mapping normalized segments to translations,
+             SegmentTranslation which made them, telling which of them are degraded and whether they may be cached)
+    """
+    segment_translation = SegmentTranslation(context)
+    if not context.incremental:
+        return segment_translation.translate(list(index.segments)), segment_translation
+
+    manifest_store = context.manifest_store
+    reused = manifest_store.reuse(context, file_segments)
+    get_metrics().increment("translation_manifest_reused_total", len(reused))
+    translation = segment_translation.translate([segment for segment in index.segments if segment not in reused])
+    translation.update(reused)
+    # Degraded translations aren't kept in manifests, revised versions get them translated again
+    manifest_store.update(context, file_segments, {segment: translated for segment, translated in translation.items()
+                                                   if segment not in segment_translation.degraded})
+    return translation, segment_translation
+
+
+def translate_files(files, executor, context: TranslationContext = None, output_languages=None):
+    """
+    Translates many files sharing one segment index, repeated content across files is translated only once
+    :param output_languages: codes of target languages, files are extracted once and translated to all of them;
+                             only the language of the context is used if None
+    :return: generator of coordinates of translated files, in order of completion, with their "output_l"
+             "cacheable" telling whether translation of the file may be cached and "degraded" telling
+             whether any of its segments was translated by other engine than the primary one
+    """
+    context = context or TranslationContext()
+    contexts = target_contexts(context, output_languages)
+    metrics = get_metrics()
+    # First phase collects segments of every file in parallel, before any translation is requested
+    # Tasks return metrics collected in the pool processes, so they are summed up in the job
+    file_segments = {}
+    for file, (segments, task_metrics) in zip(files, executor.map(run_measured, repeat(extract_file_segments),
+                                                                    files, repeat(context))):
+        file_segments[file] = segments
+        metrics.merge(task_metrics)
+    index = SegmentIndex()
+    for segments in file_segments.values():
+        index.add(segments)
+    metrics.increment("translation_files_total", len(files) * len(contexts))
+    metrics.increment("translation_segments_total", len(index) * len(contexts))
+
+    # Second phase translates each distinct segment once per target language, all targets at once
+    # Requests of every target share the adaptive concurrency limit of the process-wide client
+    with metrics.timer("translate"), ThreadPoolExecutor(max_workers=len(contexts)) as target_executor:
+        translations = list(target_executor.map(
+            lambda target_context: translate_index(index, file_segments, target_context), contexts))
+
+    # Third phase writes files in parallel, each one gets translations of its own segments only
+    futures = {}
+    for target_context, (translation, segment_translation) in zip(contexts, translations):
+        for file in files:
+            future = executor.submit(run_measured, translate_file, file, target_context,
+                                     index.lookup(file_segments[file], translation))
+            futures[future] = (target_context.output_l, segment_translation.cacheable,
+                               index.intersects(file_segments[file], segment_translation.degraded))
+    for future in as_completed(futures):
+        translated_file_coords, task_metrics = future.result()
+        metrics.merge(task_metrics)
+        (translated_file_coords["output_l"], translated_file_coords["cacheable"],
+         translated_file_coords["degraded"]) = futures[future]
+        logger.debug("Translated %s to %s", translated_file_coords["translated_file"],
+                     translated_file_coords["output_l"])
+        yield translated_file_coords
+
+
+def create_file_executor(processes: int = None):
+    """
+    Process pool translating many files at once, parsing and rewriting XML is CPU-bound
+    """
+    # Processes of the pool only extract and write files, translation requests are sent by the calling process
+    processes = processes or FILE_WORKERS or os.cpu_count() or 1
+    return ProcessPoolExecutor(max_workers=processes)
 
 
 def menu():
@@ -248,39 +370,52 @@ def menu():
         if file == "exit":
             break
         file_type = path.splitext(file)[1]
-        if file_type == ".docx":
-            translate = DocumentTranslator(file_to_translate=file)
-            translate.process_specific_file()
-        elif file_type == ".pptx":
-            translate = PresentationTranslator(file_to_translate=file)
-            translate.process_specific_file()
-        elif file_type == ".xlsx":
-            translate = WorkbookTranslator(file_to_translate=file)
-            translate.process_specific_file()
+        if file_type in TRANSLATORS:
+            # Many target languages may be given at once, e.g. "en,de,fr", the file is extracted only once
+            output_languages = [output_l.strip() for output_l in
+                                input("Type in target languages separated with commas: ").split(",")
+                                if output_l.strip()]
+            context = TranslationContext()
+            if len(output_languages) <= 1:
+                context = context.evolve(output_l=(output_languages or [context.output_l])[0])
+                translate = TRANSLATORS[file_type](file_to_translate=file, context=context)
+                translate.main()
+            else:
+                configure_translating_process(engine_name=context.engine_name)
+                with create_file_executor() as executor:
+                    for translated_file_coords in translate_files([file], executor, context, output_languages):
+                        logger.info("Translated: %s %s", translated_file_coords["output_l"],
+                                    translated_file_coords["translated_file"])
+            # Summary of the run is the output of the CLI, it can be compared between runs
+            print(json.dumps(summarize(get_metrics().snapshot()), indent=2))
         else:
-            print("Wrong file extension")
+            logger.warning("Wrong file extension")
 
         file = "exit"
 
 
-def translate_folder():
+def translate_folder(context: TranslationContext = None, output_languages=None):
+    # Files translated before from the same folder are translated incrementally, only changed segments are sent
+    context = context or TranslationContext(incremental=True)
+    files = []
     for extension in ALLOWED_EXTENSIONS:
         # Glob requires absolute path to list files of given extension
-        files = glob(path.join(SOURCE_FOLDER, "**{}".format(extension)), recursive=True)
         # Program is prepared to work with folders/files located in the same directory as the script
-        for file in files:
-            file = path.split(file)[1]
-            file_type = path.splitext(file)[1]
-            if file_type == ".docx":
-                translate = DocumentTranslator(file_to_translate=file)
-                translate.process_specific_file()
-            elif file_type == ".pptx":
-                translate = PresentationTranslator(file_to_translate=file)
-                translate.process_specific_file()
-            elif file_type == ".xlsx":
-                translate = WorkbookTranslator(file_to_translate=file)
-                translate.process_specific_file()
-
-
-menu()
-# translate_folder()
+        files += [path.split(file)[1] for file in
+                  glob(path.join(context.source_folder, "**{}".format(extension)), recursive=True)]
+
+    # Files are fanned out across processes, each one is reported as soon as it's translated
+    configure_translating_process(engine_name=context.engine_name)
+    with create_file_executor() as executor:
+        for translated_file_coords in translate_files(files, executor, context, output_languages):
+            logger.info("Translated: %s %s", translated_file_coords["output_l"],
+                        translated_file_coords["translated_file"])
+
+    # Summary of the run is the output of the CLI, it can be compared between runs
+    print(json.dumps(summarize(get_metrics().snapshot()), indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", LOG_LEVEL))
+    menu()
+    # translate_folder()
@@ -47,6 +47,116 @@ CODE_PAIRS = {
 }
 
 ALLOWED_EXTENSIONS = {".pptx", ".docx", ".xlsx"}
-TEMP_FOLDER = "temp"
+# Uploads are kept in memory up to given size (bytes), bigger ones are spooled to the folder,
+# None means the system temporary folder (tmpfs on many systems)
+UPLOAD_SPOOL_SIZE = 8 * 1024 * 1024
+UPLOAD_SPOOL_FOLDER = None
+UPLOAD_MAX_FILE_SIZE = 256 * 1024 * 1024
+# Files waiting for translation are written to their own folder of the job inside this one
+JOBS_FOLDER = "jobs"
 SOURCE_FOLDER = "source"
 TARGET_FOLDER = "target"
+
+# Translation memory shared by all workers, TTL is expressed in seconds
+TRANSLATION_MEMORY_DB = "translation_memory.sqlite3"
+TRANSLATION_MEMORY_LRU_SIZE = 20000
+TRANSLATION_MEMORY_MAX_ENTRIES = 1000000
+TRANSLATION_MEMORY_TTL = 60 * 60 * 24 * 180
+TRANSLATION_MEMORY_EVICTION_INTERVAL = 5000
+
+# Manifests of translated documents, used to translate only changed segments of revised versions
+# Manifests unused for TTL (seconds) are forgotten, the least recently used ones above given count of segments too
+MANIFEST_DB = "manifests.sqlite3"
+MANIFEST_TTL = 60 * 60 * 24 * 180
+MANIFEST_MAX_SEGMENTS = 1000000
+MANIFEST_EVICTION_INTERVAL = 100
+
+# Cache of whole translated archives, the least recently used ones are forgotten above given count or size (bytes)
+RESULT_CACHE_DB = "result_cache.sqlite3"
+RESULT_CACHE_MAX_ENTRIES = 10000
+RESULT_CACHE_MAX_BYTES = 10 * 1024 * 1024 * 1024
+
+# Batching of segments, AWS Translate accepts up to 10 000 bytes of UTF-8 text in a single request
+TRANSLATE_BYTE_LIMIT = 10000
+BATCH_SENTINEL = "|||"
+
+# Translation engine: "aws", "http" or "glossary", comma separated names make failover chain, e.g. "aws,glossary"
+TRANSLATION_ENGINE = "aws"
+HTTP_ENGINE_URL = "https://translate.yandex.net/api/v1.5/tr.json/translate"
+HTTP_ENGINE_BYTE_LIMIT = 10000
+HTTP_ENGINE_CONCURRENCY = 8
+HTTP_ENGINE_TIMEOUT = 30
+GLOSSARY_FILE = "glossary.json"
+GLOSSARY_ENGINE_CONCURRENCY = 64
+# Mock engine of benchmarks, latency of each call is expressed in seconds
+MOCK_ENGINE_LATENCY = 0.05
+MOCK_ENGINE_THROTTLE_RATE = 0.0
+
+# Shared asynchronous translation client, concurrency is adjusted between the limits with AIMD rule
+ASYNC_INITIAL_CONCURRENCY = 4
+ASYNC_MIN_CONCURRENCY = 1
+ASYNC_MAX_CONCURRENCY = 16
+ASYNC_MAX_RETRIES = 6
+ASYNC_BACKOFF_BASE = 0.2
+ASYNC_BACKOFF_CAP = 20
+THROTTLING_ERROR_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException",
+                          "LimitExceededException"}
+# Error code of engines which can't be reached, failover engine tries the next one
+ENGINE_UNAVAILABLE_CODE = "EngineUnavailableException"
+
+# Streaming rewriter of OOXML parts reads them in chunks of given size (bytes),
+# parts bigger than the threshold are written with zip64 extensions
+XML_CHUNK_SIZE = 1024 * 1024
+XML_ZIP64_THRESHOLD = 1024 * 1024 * 1024
+# Texts of runs with different formatting are joined into paragraph-level segments,
+# markup between two runs longer than given size (characters) ends the segment
+RUN_BOUNDARY_MAX_SIZE = 4096
+
+# Number of threads reading and rewriting parts of a single package
+PACKAGE_WORKERS = 4
+
+# Number of recent translations kept while presentation is translated slide by slide in legacy CLI
+SLIDE_WORKING_SET_SIZE = 5000
+
+# Unchanged members of the package are copied in chunks of given size (bytes)
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Background translation jobs, intervals and timeouts are expressed in seconds
+JOBS_DB = "jobs.sqlite3"
+JOB_WORKERS = 2
+JOB_POLL_INTERVAL = 1
+JOB_STALE_TIMEOUT = 60 * 60
+JOB_REQUEUE_INTERVAL = 60 * 5
+RESULT_ARCHIVE = "translated_files.zip"
+RESULTS_BUCKET = "translatedfiles"
+
+# History of translations is kept with the jobs, browser keeps only the opaque user id in the cookie
+USER_COOKIE = "translator_user"
+USER_COOKIE_MAX_AGE = 60 * 60 * 24 * 30
+HISTORY_PAGE_SIZE = 20
+
+# Clients of AWS services shared by the whole process, timeouts are expressed in seconds
+AWS_REGION = "us-east-1"
+AWS_DEFAULT_POOL_CONNECTIONS = 10
+AWS_CONNECT_TIMEOUT = 10
+AWS_READ_TIMEOUT = 60
+
+# Storage of translated archives, sizes are expressed in bytes
+S3_MAX_POOL_CONNECTIONS = 32
+S3_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+S3_MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+S3_TRANSFER_CONCURRENCY = 10
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+LOCAL_STORAGE_FOLDER = "storage"
+
+# Storage backend: "s3" or "local" (local disk or NFS mount), results and unused blobs expire after given seconds
+STORAGE_BACKEND = "s3"
+RESULT_TTL = 60 * 60 * 24 * 30
+BLOB_GRACE_PERIOD = 60 * 60
+STORAGE_SWEEP_INTERVAL = 60 * 60
+
+# Number of processes translating files of a single job, None means number of CPU cores
+FILE_WORKERS = None
+
+# Level of logs of the CLI entry points and the server, may be overridden with LOG_LEVEL environment variable
+LOG_LEVEL = "INFO"